@@ -0,0 +1,124 @@
+"""
+Endpoint bookkeeping and staggered ("happy eyeballs") connection racing.
+"""
+
+import time
+import asyncio
+
+
+def parse_endpoints(spec, default_port=None):
+   "parse a 'host:port,host:port' string into a list of (host, port) tuples"
+
+   endpoints = []
+   for item in spec.split(","):
+      item = item.strip()
+      if not item:
+         continue
+      (host, sep, port) = item.rpartition(":")
+      if not sep or "]" in port:
+         # no port given, or a bare bracketed IPv6 address
+         (host, port) = (item, default_port)
+      endpoints.append((host.strip("[]"), int(port) if port else port))
+   return endpoints
+
+
+def interleave_families(addrinfos):
+   "order getaddrinfo results so that address families alternate (RFC 8305)"
+
+   families = {}
+   for info in addrinfos:
+      families.setdefault(info[0], []).append(info)
+
+   ordered = []
+   groups = list(families.values())
+   while any(groups):
+      for group in groups:
+         if group:
+            ordered.append(group.pop(0))
+   return ordered
+
+
+class EndpointSet:
+   "track the health of a list of (host, port) endpoints and order them for connecting"
+
+   def __init__(self, endpoints, penalty=30, clock=time.monotonic):
+      if not endpoints:
+         raise ValueError("at least one endpoint is required")
+      self.endpoints = list(endpoints)
+      self.penalty = penalty # seconds an endpoint is considered down after failing
+      self.current = self.endpoints[0]
+      self._clock = clock
+      self._down_until = {}
+
+   def is_healthy(self, endpoint):
+      return self._down_until.get(endpoint, 0) <= self._clock()
+
+   def healthy(self):
+      "return the endpoints that are not currently considered down"
+      return [endpoint for endpoint in self.endpoints if self.is_healthy(endpoint)]
+
+   def ordered(self):
+      "healthy endpoints first, starting from the current one, then the rest"
+      start = self.endpoints.index(self.current)
+      rotated = self.endpoints[start:] + self.endpoints[:start]
+      down = [endpoint for endpoint in rotated if not self.is_healthy(endpoint)]
+      down.sort(key=lambda endpoint: self._down_until[endpoint])
+      return [endpoint for endpoint in rotated if self.is_healthy(endpoint)] + down
+
+   def connected(self, endpoint):
+      self.current = endpoint
+      self._down_until.pop(endpoint, None)
+
+   def failed(self, endpoint):
+      "mark the endpoint down and move on to the next one"
+      self._down_until[endpoint] = self._clock() + self.penalty
+      if endpoint == self.current:
+         index = self.endpoints.index(endpoint)
+         self.current = self.endpoints[(index + 1) % len(self.endpoints)]
+
+
+async def race_connections(loop, connectors, delay):
+   """
+   start the connector coroutine functions one after another, `delay` seconds
+   apart or as soon as the previous attempt fails, and return (index, result)
+   of the first one to succeed; the other attempts are cancelled and any
+   transport they managed to connect in the meantime is closed
+   """
+
+   connectors = list(connectors)
+   attempts = {}
+   pending = set()
+   errors = []
+   winner = None
+
+   try:
+      while winner is None and (len(attempts) < len(connectors) or pending):
+         if len(attempts) < len(connectors):
+            task = loop.create_task(connectors[len(attempts)]())
+            attempts[task] = len(attempts)
+            pending.add(task)
+         more = len(attempts) < len(connectors)
+         (done, pending) = await asyncio.wait(pending, loop=loop,
+            timeout=delay if more else None, return_when=asyncio.FIRST_COMPLETED)
+         for task in sorted(done, key=attempts.get):
+            if task.exception() is not None:
+               errors.append(task.exception())
+            elif winner is None:
+               winner = task
+            else:
+               task.result()[0].close()
+   finally:
+      for task in pending:
+         task.cancel()
+      if pending:
+         results = await asyncio.gather(*pending, loop=loop, return_exceptions=True)
+         for result in results:
+            if isinstance(result, tuple):
+               result[0].close()
+
+   if winner is not None:
+      return (attempts[winner], winner.result())
+   if len(errors) == 1:
+      raise errors[0]
+   raise OSError("all %i connection attempts failed: %s" %
+                 (len(errors), ", ".join(str(exc) for exc in errors)))
@@ -0,0 +1,69 @@
+"""
+Framers that find complete frames in a receive buffer without copying.
+
+A framer looks at buffer[start:end] and returns None if no complete frame is
+there yet, or a (first, last, next) tuple: the frame payload is
+buffer[first:last] and the following frame starts at next. It is also told
+how many bytes from start it has already looked at without finding a frame,
+so that it need not scan them again as more data arrives.
+"""
+
+import struct
+
+
+class FramingError(Exception):
+   ""
+
+
+class LengthPrefixFramer:
+   "frames preceded by a big-endian unsigned length header"
+
+   FORMATS = {1: "!B", 2: "!H", 4: "!I", 8: "!Q"}
+
+   def __init__(self, header_size=4, max_size=16 * 1024 * 1024):
+      self.header = struct.Struct(self.FORMATS[header_size])
+      self.max_size = max_size
+
+   def frame(self, buffer, start, end, scanned=0):
+      if end - start < self.header.size:
+         return None
+      (length,) = self.header.unpack_from(buffer, start)
+      if length > self.max_size:
+         raise FramingError("frame of %i bytes exceeds maximum of %i" % (length, self.max_size))
+      first = start + self.header.size
+      if end - first < length:
+         return None
+      return (first, first + length, first + length)
+
+
+class DelimiterFramer:
+   "frames terminated by a delimiter, which is not part of the frame"
+
+   def __init__(self, delimiter=b"\n", max_size=1024 * 1024):
+      self.delimiter = delimiter
+      self.max_size = max_size
+
+   def frame(self, buffer, start, end, scanned=0):
+      # a delimiter may have been cut short at the end of what was scanned
+      resume = max(start, start + scanned - len(self.delimiter) + 1)
+      position = buffer.find(self.delimiter, resume, end)
+      if position < 0:
+         if end - start > self.max_size:
+            raise FramingError("no delimiter within %i bytes" % self.max_size)
+         return None
+      if position - start > self.max_size:
+         raise FramingError("frame of %i bytes exceeds maximum of %i" %
+                            (position - start, self.max_size))
+      return (start, position, position + len(self.delimiter))
+
+
+class FixedSizeFramer:
+   "frames of a fixed number of bytes"
+
+   def __init__(self, size):
+      self.size = size
+
+   def frame(self, buffer, start, end, scanned=0):
+      if end - start < self.size:
+         return None
+      return (start, start + self.size, start + self.size)
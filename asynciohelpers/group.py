@@ -0,0 +1,87 @@
+"""
+Run several services on one loop, setting them up concurrently in dependency order.
+"""
+
+import asyncio
+
+from .exceptions import SetupException
+from .util import loggerprovider
+
+
+@loggerprovider
+class ServiceGroup:
+   """
+   services sharing a loop; each is started as soon as the services it comes
+   after have started, and they are stopped in the reverse order
+   """
+
+   def __init__(self, loop=None):
+      self._loop = loop
+      self._after = {} # service: services it is started after, in order added
+      self._started = [] # services in the order they completed setup
+      self._stopping = [] # services to stop should the group not start
+
+   def add(self, service, after=()):
+      "add a service to start after the given, already added services; return it"
+      for dependency in after:
+         if dependency not in self._after:
+            raise ValueError("%r must be added before %r" % (dependency, service))
+      self._after[service] = tuple(after)
+      return service
+
+   async def _start(self, service, starting):
+      dependencies = [starting[dependency] for dependency in self._after[service]]
+      if dependencies:
+         try:
+            await asyncio.gather(*dependencies, loop=self._loop)
+         except Exception:
+            raise SetupException("%s not started, a dependency failed"
+                                 % service.__class__.__name__)
+      service.set_loop(self._loop)
+      self._stopping.append(service)
+      await service.start()
+      self._started.append(service)
+
+   async def start(self):
+      "start all services; if any fails, stop the others and raise SetupException"
+
+      self._loop = self._loop or asyncio.get_event_loop()
+      self._started = []
+      self._stopping = []
+      starting = {}
+      for service in self._after:
+         starting[service] = self._loop.create_task(self._start(service, starting))
+      await asyncio.wait(starting.values(), loop=self._loop)
+
+      failed = [service for (service, task) in starting.items() if task.exception()]
+      if failed:
+         for service in failed:
+            self._logger.error("%s failed to start: %s",
+                               service.__class__.__name__, starting[service].exception())
+         await self._stop(self._stopping)
+         raise SetupException("%i of %i services failed to start"
+                              % (len(failed), len(starting)))
+      self._logger.info("started %i services", len(starting))
+
+   async def _stop(self, services):
+      for service in reversed(services):
+         await service.stop()
+
+   async def stop(self):
+      "stop the services in the reverse of the order they started in"
+      await self._stop(self._started)
+      self._started = []
+
+   async def wait(self):
+      "wait until the waiters of all services are done"
+      await asyncio.wait([service._wait_task for service in self._started], loop=self._loop)
+
+   def run(self):
+      "start the group, run until the services are done or interrupted, then stop it"
+      self._loop = self._loop or asyncio.get_event_loop()
+      self._loop.run_until_complete(self.start())
+      try:
+         self._loop.run_until_complete(self.wait())
+      except KeyboardInterrupt:
+         self._logger.info("service group terminated by user action")
+      self._loop.run_until_complete(self.stop())
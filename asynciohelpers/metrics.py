@@ -0,0 +1,227 @@
+"""
+Low-overhead metrics (counters, gauges and histograms) and an optional
+in-loop HTTP endpoint serving them in the Prometheus text format.
+
+Metric families are declared once, at import time, in the module that
+updates them; a labelled child is looked up once and then updated directly.
+"""
+
+import math
+import asyncio
+from array import array
+from bisect import bisect_left
+
+
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+   return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value):
+   if value == math.inf:
+      return "+Inf"
+   if isinstance(value, float) and value.is_integer():
+      return str(int(value))
+   return repr(value)
+
+
+def _labelset(names, values, extra=()):
+   pairs = list(zip(names, values)) + list(extra)
+   if not pairs:
+      return ""
+   return "{%s}" % ",".join('%s="%s"' % (name, _escape(value)) for (name, value) in pairs)
+
+
+class CounterChild:
+
+   __slots__ = ("value",)
+
+   def __init__(self):
+      self.value = 0
+
+   def inc(self, amount=1):
+      self.value += amount
+
+
+class GaugeChild:
+
+   __slots__ = ("value",)
+
+   def __init__(self):
+      self.value = 0
+
+   def set(self, value):
+      self.value = value
+
+   def inc(self, amount=1):
+      self.value += amount
+
+   def dec(self, amount=1):
+      self.value -= amount
+
+
+class HistogramChild:
+
+   __slots__ = ("buckets", "counts", "sum", "count")
+
+   def __init__(self, buckets):
+      self.buckets = buckets
+      self.counts = array("Q", bytes(8 * (len(buckets) + 1))) # last one is +Inf
+      self.sum = 0.0
+      self.count = 0
+
+   def observe(self, value):
+      self.counts[bisect_left(self.buckets, value)] += 1
+      self.sum += value
+      self.count += 1
+
+
+class MetricFamily:
+   "a named metric with a fixed set of label names and one child per label values"
+
+   TYPE = None
+
+   def __init__(self, name, documentation, labelnames=()):
+      self.name = name
+      self.documentation = documentation
+      self.labelnames = tuple(labelnames)
+      self._children = {}
+
+   def _new_child(self):
+      raise NotImplementedError
+
+   def labels(self, *values):
+      "return the child for the given label values, creating it on first use"
+      try:
+         return self._children[values]
+      except KeyError:
+         if len(values) != len(self.labelnames):
+            raise ValueError("%s expects labels %r" % (self.name, self.labelnames))
+         child = self._children[values] = self._new_child()
+         return child
+
+   def _samples(self, values, child):
+      yield (self.name, _labelset(self.labelnames, values), child.value)
+
+   def render(self):
+      lines = ["# HELP %s %s" % (self.name, self.documentation),
+               "# TYPE %s %s" % (self.name, self.TYPE)]
+      for (values, child) in sorted(self._children.items()):
+         for (name, labels, value) in self._samples(values, child):
+            lines.append("%s%s %s" % (name, labels, _format(value)))
+      return "\n".join(lines)
+
+
+class Counter(MetricFamily):
+   TYPE = "counter"
+   _new_child = CounterChild
+
+
+class Gauge(MetricFamily):
+   TYPE = "gauge"
+   _new_child = GaugeChild
+
+
+class Histogram(MetricFamily):
+
+   TYPE = "histogram"
+
+   def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+      super().__init__(name, documentation, labelnames)
+      self.buckets = tuple(sorted(buckets))
+
+   def _new_child(self):
+      return HistogramChild(self.buckets)
+
+   def _samples(self, values, child):
+      cumulative = 0
+      for (bound, count) in zip(self.buckets + (math.inf,), child.counts):
+         cumulative += count
+         labels = _labelset(self.labelnames, values, (("le", _format(float(bound))),))
+         yield (self.name + "_bucket", labels, cumulative)
+      labels = _labelset(self.labelnames, values)
+      yield (self.name + "_sum", labels, child.sum)
+      yield (self.name + "_count", labels, child.count)
+
+
+class Registry:
+   "collection of metric families; declaring an existing name returns it"
+
+   def __init__(self):
+      self._families = {}
+
+   def _declare(self, cls, name, *args, **kwargs):
+      family = self._families.get(name)
+      if family is None:
+         family = self._families[name] = cls(name, *args, **kwargs)
+      elif type(family) is not cls:
+         raise ValueError("metric %s is already declared as a %s" % (name, family.TYPE))
+      return family
+
+   def counter(self, name, documentation, labelnames=()):
+      return self._declare(Counter, name, documentation, labelnames)
+
+   def gauge(self, name, documentation, labelnames=()):
+      return self._declare(Gauge, name, documentation, labelnames)
+
+   def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+      return self._declare(Histogram, name, documentation, labelnames, buckets)
+
+   def render(self):
+      "return all metrics in the Prometheus text exposition format"
+      return "\n".join(family.render() for family in self._families.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class MetricsProtocol(asyncio.Protocol):
+   "answer a single HTTP GET of /metrics with the registry contents"
+
+   MAX_REQUEST = 8192
+
+   def __init__(self, registry):
+      self.registry = registry
+      self.request = b""
+
+   def connection_made(self, transport):
+      self.transport = transport
+
+   def data_received(self, data):
+      self.request += data
+      if b"\r\n\r\n" not in self.request and len(self.request) < self.MAX_REQUEST:
+         return
+
+      line = self.request.split(b"\r\n", 1)[0].split()
+      if len(line) >= 2 and line[0] == b"GET" and line[1].split(b"?")[0] in (b"/", b"/metrics"):
+         (status, body) = ("200 OK", self.registry.render().encode("utf-8"))
+      else:
+         (status, body) = ("404 Not Found", b"not found\n")
+
+      head = ("HTTP/1.0 %s\r\n"
+              "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+              "Content-Length: %i\r\n"
+              "Connection: close\r\n\r\n" % (status, len(body)))
+      self.transport.write(head.encode("ascii") + body)
+      self.transport.close()
+
+
+class MetricsServer:
+   "tiny HTTP server, run on the service loop, exposing a registry to Prometheus"
+
+   def __init__(self, host="127.0.0.1", port=9100, registry=REGISTRY, loop=None):
+      self.host = host
+      self.port = port
+      self.registry = registry
+      self.loop = loop or asyncio.get_event_loop()
+      self.server = None
+
+   async def start(self):
+      factory = lambda: MetricsProtocol(self.registry)
+      self.server = await self.loop.create_server(factory, self.host, self.port)
+
+   async def stop(self):
+      self.server.close()
+      await self.server.wait_closed()
@@ -0,0 +1,74 @@
+"""
+Event loop lag monitor.
+
+A coroutine on the monitored loop measures how late its wakeups are, and a
+watchdog thread notices when the loop has not come round for longer than the
+threshold, capturing the stack of the loop thread while it is still blocked.
+"""
+
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+
+from .metrics import REGISTRY
+
+
+LOOP_LAG = REGISTRY.histogram(
+   "asynciohelpers_loop_lag_seconds", "Event loop wakeup lag.", ("service",),
+   buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+LOOP_STALLS = REGISTRY.counter(
+   "asynciohelpers_loop_stalls_total", "Event loop stalls over the threshold.", ("service",))
+
+
+class LagMonitor:
+   "sample event loop lag and log the stack of whatever blocks the loop"
+
+   def __init__(self, loop, name, interval=0.1, threshold=0.5, logger=None):
+      self.loop = loop
+      self.interval = interval # seconds between samples
+      self.threshold = threshold # seconds of stall before the stack is captured
+      self.stalls = deque(maxlen=10) # (duration, task, stack) of recent stalls
+      self._logger = logger or logging.getLogger(self.__class__.__name__)
+      self._lag = LOOP_LAG.labels(name)
+      self._stall_count = LOOP_STALLS.labels(name)
+      self._stopped = threading.Event()
+      self._thread_id = None
+      self._beat = time.monotonic()
+
+   def start(self):
+      self._stopped.clear()
+      self._task = self.loop.create_task(self._sample())
+      self._watchdog = threading.Thread(target=self._watch, name="lag-monitor", daemon=True)
+      self._watchdog.start()
+
+   def stop(self):
+      self._stopped.set()
+      self._task.cancel()
+
+   async def _sample(self):
+      self._thread_id = threading.get_ident()
+      while True:
+         self._beat = time.monotonic()
+         scheduled = self.loop.time() + self.interval
+         await asyncio.sleep(self.interval, loop=self.loop)
+         self._lag.observe(max(self.loop.time() - scheduled, 0))
+
+   def _watch(self):
+      reported = None
+      while not self._stopped.wait(self.interval):
+         beat = self._beat
+         stalled = time.monotonic() - beat - self.interval
+         if stalled < self.threshold or beat == reported or self._thread_id is None:
+            continue
+         reported = beat
+         frame = sys._current_frames().get(self._thread_id)
+         stack = "".join(traceback.format_stack(frame)) if frame else ""
+         task = asyncio.current_task(self.loop)
+         self.stalls.append((stalled, repr(task), stack))
+         self._stall_count.inc()
+         self._logger.warning("event loop blocked for over %.2f seconds in %r:\n%s",
+                              stalled, task, stack)
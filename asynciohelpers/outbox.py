@@ -0,0 +1,156 @@
+"""
+Outbox that holds outbound messages while a service is disconnected.
+
+Messages are kept in memory up to a byte limit; past that they spill to a
+ring of length-prefixed records in a memory-mapped file, so that long
+outages under load cost disk space instead of process memory.
+"""
+
+import os
+import mmap
+import struct
+from collections import deque
+
+
+HEADER = struct.Struct("!I")
+
+
+class SpillRing:
+   "fixed size ring of length-prefixed records in a memory-mapped file"
+
+   def __init__(self, size, path=None):
+      if path is None:
+         import tempfile # only needed here, and slow to import
+         (fd, path) = tempfile.mkstemp(prefix="outbox-", suffix=".ring")
+         self._temporary = True
+      else:
+         fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+         self._temporary = False
+      os.ftruncate(fd, size)
+      self._map = mmap.mmap(fd, size)
+      os.close(fd)
+      self.path = path
+      self.size = size
+      self.used = 0 # bytes, including record headers
+      self.count = 0
+      self._head = 0 # offset of the oldest record
+      self._tail = 0 # offset to write the next record at
+
+   def __len__(self):
+      return self.count
+
+   def _put(self, offset, data):
+      end = offset + len(data)
+      if end <= self.size:
+         self._map[offset:end] = data
+      else:
+         split = self.size - offset
+         self._map[offset:] = data[:split]
+         self._map[:end - self.size] = data[split:]
+
+   def _get(self, offset, length):
+      end = offset + length
+      if end <= self.size:
+         return self._map[offset:end]
+      return self._map[offset:] + self._map[:end - self.size]
+
+   def append(self, data):
+      "store a record, returning False if there is no room for it"
+      needed = HEADER.size + len(data)
+      if self.used + needed > self.size:
+         return False
+      self._put(self._tail, HEADER.pack(len(data)))
+      self._put((self._tail + HEADER.size) % self.size, data)
+      self._tail = (self._tail + needed) % self.size
+      self.used += needed
+      self.count += 1
+      return True
+
+   def peek_size(self):
+      "return the payload size of the oldest record"
+      return HEADER.unpack(self._get(self._head, HEADER.size))[0]
+
+   def popleft(self):
+      if not self.count:
+         raise IndexError("pop from an empty ring")
+      length = self.peek_size()
+      data = self._get((self._head + HEADER.size) % self.size, length)
+      self._head = (self._head + HEADER.size + length) % self.size
+      self.used -= HEADER.size + length
+      self.count -= 1
+      if not self.count:
+         self._head = self._tail = 0
+      return data
+
+   def close(self):
+      self._map.close()
+      if self._temporary:
+         os.unlink(self.path)
+
+
+class Outbox:
+   "in-order message buffer bounded in memory, spilling to a SpillRing"
+
+   def __init__(self, memory_limit, spill_size=0, spill_path=None):
+      self.memory_limit = memory_limit
+      self.spill_size = spill_size # zero disables spilling
+      self.spill_path = spill_path
+      self._memory = deque()
+      self._memory_bytes = 0
+      self._spill = None
+      self.stats = {"queued": 0, "spilled": 0, "dropped": 0, "flushed": 0}
+
+   def __len__(self):
+      return len(self._memory) + (len(self._spill) if self._spill else 0)
+
+   def append(self, data):
+      "queue a message, returning False if it had to be dropped"
+
+      spilling = self._spill is not None and len(self._spill)
+      if not spilling and self._memory_bytes + len(data) <= self.memory_limit:
+         self._memory.append(data)
+         self._memory_bytes += len(data)
+      elif self.spill_size:
+         # once spilling, keep spilling until drained so that order is kept
+         if self._spill is None:
+            self._spill = SpillRing(self.spill_size, self.spill_path)
+         if not self._spill.append(data):
+            self.stats["dropped"] += 1
+            return False
+         self.stats["spilled"] += 1
+      else:
+         self.stats["dropped"] += 1
+         return False
+
+      self.stats["queued"] += 1
+      return True
+
+   def popleft(self):
+      if self._memory:
+         data = self._memory.popleft()
+         self._memory_bytes -= len(data)
+      elif self._spill:
+         data = self._spill.popleft()
+      else:
+         raise IndexError("pop from an empty outbox")
+      self.stats["flushed"] += 1
+      return data
+
+   def batch(self, max_bytes):
+      "pop the oldest messages, up to max_bytes in total but at least one"
+      messages = [self.popleft()]
+      size = len(messages[0])
+      while len(self) and size + self._next_size() <= max_bytes:
+         messages.append(self.popleft())
+         size += len(messages[-1])
+      return messages
+
+   def _next_size(self):
+      return len(self._memory[0]) if self._memory else self._spill.peek_size()
+
+   def close(self):
+      self._memory.clear()
+      self._memory_bytes = 0
+      if self._spill is not None:
+         self._spill.close()
+         self._spill = None
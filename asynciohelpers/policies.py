@@ -0,0 +1,141 @@
+"""
+Reconnect policies that decide how long to wait before each connect attempt.
+
+A policy is stateful and owned by a single service instance. The service asks
+it for the next delay before every attempt and reports the outcome back, so
+the policy can back off, jitter and trip its circuit breaker as needed.
+"""
+
+import random
+from abc import ABCMeta, abstractmethod
+
+
+class ReconnectPolicy(metaclass=ABCMeta):
+   "base policy: connect immediately on first start, then delay per attempt"
+
+   def __init__(self):
+      self._started = False
+      self.attempt = 0 # consecutive failed attempts
+      self.stats = {
+         "attempts": 0,
+         "successes": 0,
+         "failures": 0,
+         "delayed": 0.0, # total seconds spent waiting
+      }
+
+   @abstractmethod
+   def _delay(self, attempt):
+      "return the delay before retrying after the given number of failures"
+
+   def next_delay(self):
+      "return the number of seconds to wait before the next attempt"
+      if not self._started:
+         self._started = True
+         delay = 0
+      else:
+         delay = self._delay(self.attempt)
+      self.stats["attempts"] += 1
+      self.stats["delayed"] += delay
+      return delay
+
+   def succeeded(self):
+      "report a successful connect"
+      self.attempt = 0
+      self.stats["successes"] += 1
+
+   def failed(self):
+      "report a failed connect attempt"
+      self.attempt += 1
+      self.stats["failures"] += 1
+
+
+class FixedDelay(ReconnectPolicy):
+   "wait the same amount of time before each retry"
+
+   def __init__(self, delay):
+      super().__init__()
+      self.delay = delay
+
+   def _delay(self, attempt):
+      return self.delay
+
+
+class ExponentialBackoff(ReconnectPolicy):
+   """
+   exponential backoff capped at `cap` seconds, with optional jitter
+
+   jitter may be None, "full" (uniformly between zero and the backoff) or
+   "decorrelated" (grows from the previous delay, as per the AWS write-up)
+   """
+
+   JITTERS = (None, "full", "decorrelated")
+
+   def __init__(self, base=0.5, cap=60, factor=2, jitter="full"):
+      if jitter not in self.JITTERS:
+         raise ValueError("unknown jitter %r, expected one of %r" % (jitter, self.JITTERS))
+      super().__init__()
+      self.base = base
+      self.cap = cap
+      self.factor = factor
+      self.jitter = jitter
+      self._previous = base
+
+   def _delay(self, attempt):
+      if self.jitter == "decorrelated":
+         delay = min(self.cap, random.uniform(self.base, self._previous * 3))
+         self._previous = delay
+         return delay
+      delay = min(self.cap, self.base * self.factor ** max(attempt - 1, 0))
+      if self.jitter == "full":
+         delay = random.uniform(0, delay)
+      return delay
+
+   def succeeded(self):
+      super().succeeded()
+      self._previous = self.base
+
+
+class CircuitBreaker(ReconnectPolicy):
+   """
+   wrap another policy and open the circuit after `threshold` consecutive
+   failures; while open, attempts are held off for `reset_timeout` seconds,
+   after which a single half-open trial attempt is let through
+   """
+
+   CLOSED = "closed"
+   OPEN = "open"
+   HALF_OPEN = "half-open"
+
+   def __init__(self, policy, threshold=10, reset_timeout=60):
+      super().__init__()
+      self.policy = policy
+      self.threshold = threshold
+      self.reset_timeout = reset_timeout
+      self.state = self.CLOSED
+      self.stats["opened"] = 0
+
+   def _delay(self, attempt):
+      return self.policy._delay(attempt)
+
+   def next_delay(self):
+      if self.state == self.OPEN:
+         self.state = self.HALF_OPEN
+         delay = self.reset_timeout
+      else:
+         delay = self.policy.next_delay()
+      self.stats["attempts"] += 1
+      self.stats["delayed"] += delay
+      return delay
+
+   def succeeded(self):
+      super().succeeded()
+      self.policy.succeeded()
+      self.state = self.CLOSED
+
+   def failed(self):
+      super().failed()
+      self.policy.failed()
+      if self.state == self.HALF_OPEN or self.attempt >= self.threshold:
+         if self.state != self.OPEN:
+            self.stats["opened"] += 1
+         self.state = self.OPEN
@@ -0,0 +1,127 @@
+"""
+Protocol base classes for use as a connecting service's _transport_factory.
+"""
+
+import asyncio
+
+
+class FlowControlProtocol(asyncio.Protocol):
+   "protocol that tracks transport write flow control so writers can wait on it"
+
+   _paused = False
+   _lost = False
+   _drain_waiter = None
+
+   def pause_writing(self):
+      self._paused = True
+
+   def resume_writing(self):
+      self._paused = False
+      self._wake_writer()
+
+   def connection_lost(self, exc):
+      self._lost = True
+      self._wake_writer(exc or ConnectionResetError("connection lost"))
+
+   def _wake_writer(self, exc=None):
+      waiter = self._drain_waiter
+      self._drain_waiter = None
+      if waiter is None or waiter.done():
+         return
+      if exc is None:
+         waiter.set_result(None)
+      else:
+         waiter.set_exception(exc)
+
+   async def drain(self):
+      "return once the transport accepts writes again"
+      if self._lost:
+         raise ConnectionResetError("connection lost")
+      if not self._paused:
+         return
+      if self._drain_waiter is None or self._drain_waiter.done():
+         self._drain_waiter = asyncio.Future(loop=asyncio.get_event_loop())
+      await self._drain_waiter
+
+
+class MessageProtocol(FlowControlProtocol):
+   "protocol that passes each received chunk on to the service's message queue"
+
+   inbound = None # set by the connecting service
+   transport = None
+
+   def connection_made(self, transport):
+      self.transport = transport
+
+   def data_received(self, data):
+      self.message_received(data)
+
+   def message_received(self, message):
+      if self.inbound is not None:
+         self.inbound.put(message, self.transport)
+
+
+class FramedProtocol(MessageProtocol, asyncio.BufferedProtocol):
+   """
+   protocol that receives into a preallocated, growable buffer and hands out
+   complete frames as memoryview slices of it; a frame is only valid during
+   the frame_received() call, so copy it (bytes(frame)) to keep it around
+   """
+
+   FRAMER = None # framer instance, see the framing module
+   BUFFER_SIZE = 64 * 1024 # initial receive buffer size, bytes
+   MAX_BUFFER_SIZE = 16 * 1024 * 1024 # the buffer never grows beyond this
+
+   _buffer = None
+   _scanned = 0 # pending bytes the framer has seen without finding a frame
+
+   def _allocate(self, size):
+      "replace the buffer with a new one, keeping any unprocessed bytes"
+      buffer = bytearray(size)
+      pending = self._end - self._start if self._buffer is not None else 0
+      if pending:
+         buffer[:pending] = self._view[self._start:self._end]
+      if self._buffer is not None:
+         self._view.release()
+      self._buffer = buffer
+      self._view = memoryview(buffer)
+      (self._start, self._end) = (0, pending)
+
+   def get_buffer(self, sizehint):
+      if self._buffer is None:
+         self._allocate(self.BUFFER_SIZE)
+
+      if self._end == len(self._buffer):
+         pending = self._end - self._start
+         if pending < len(self._buffer) // 2:
+            # move the partial frame to the front to make room
+            self._buffer[:pending] = self._view[self._start:self._end]
+            (self._start, self._end) = (0, pending)
+         elif len(self._buffer) < self.MAX_BUFFER_SIZE:
+            self._allocate(min(len(self._buffer) * 2, self.MAX_BUFFER_SIZE))
+         else:
+            raise BufferError("receive buffer of %i bytes is full" % len(self._buffer))
+
+      return self._view[self._end:]
+
+   def buffer_updated(self, nbytes):
+      self._end += nbytes
+      framer = self.FRAMER
+      while self._start < self._end:
+         found = framer.frame(self._buffer, self._start, self._end, self._scanned)
+         if found is None:
+            self._scanned = self._end - self._start
+            break
+         (first, last, self._start) = found
+         self._scanned = 0
+         frame = self._view[first:last]
+         try:
+            self.frame_received(frame)
+         finally:
+            frame.release()
+      if self._start == self._end:
+         self._start = self._end = 0
+
+   def frame_received(self, frame):
+      "called with a memoryview of each complete frame; queues a copy by default"
+      self.message_received(bytes(frame))
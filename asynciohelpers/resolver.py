@@ -0,0 +1,95 @@
+"""
+Caching wrapper around loop.getaddrinfo() for the connect and reconnect paths.
+
+getaddrinfo() does not report record TTLs, so entries live for a configured
+time instead. Entries are refreshed in the background shortly before they
+expire, and served stale for a while longer if refreshing them fails.
+"""
+
+import socket
+import asyncio
+
+from .metrics import REGISTRY
+
+
+DNS_LOOKUPS = REGISTRY.counter(
+   "asynciohelpers_dns_lookups_total", "Cached address lookups by result.", ("result",))
+
+
+class CachingResolver:
+   "getaddrinfo cache with negative caching, prefetching and serve-stale"
+
+   def __init__(self, loop, ttl=300, negative_ttl=5, prefetch=0.9, stale=300, spawn=None):
+      self.loop = loop
+      self.ttl = ttl # seconds an answer is fresh
+      self.negative_ttl = negative_ttl # seconds a failure to resolve is remembered
+      self.prefetch = prefetch # fraction of the ttl after which a hit refreshes the entry
+      self.stale = stale # seconds past expiry an answer is served while refreshing
+      self._spawn = spawn or loop.create_task
+      self._entries = {} # key: (resolved at, addresses or the OSError raised)
+      self._lookups = {} # key: future of the lookup in progress
+      self.stats = {"hits": 0, "misses": 0, "stale": 0, "negative": 0, "prefetches": 0}
+      self._counts = {result: DNS_LOOKUPS.labels(result) for result in self.stats}
+
+   def _count(self, result):
+      self.stats[result] += 1
+      self._counts[result].inc()
+
+   async def getaddrinfo(self, host, port, family=0, type=socket.SOCK_STREAM, proto=0, flags=0):
+      "return the addresses of host like loop.getaddrinfo(), from the cache if possible"
+
+      key = (host, port, family, type, proto, flags)
+      entry = self._entries.get(key)
+      if entry is not None:
+         (resolved, result) = entry
+         age = self.loop.time() - resolved
+         if isinstance(result, OSError):
+            if age < self.negative_ttl:
+               self._count("negative")
+               raise result
+         elif age < self.ttl:
+            self._count("hits")
+            if age > self.ttl * self.prefetch and key not in self._lookups:
+               self._count("prefetches")
+               self._lookup(key)
+            return result
+         elif age < self.ttl + self.stale:
+            self._count("stale")
+            self._lookup(key)
+            return result
+
+      self._count("misses")
+      result = await asyncio.shield(self._lookup(key), loop=self.loop)
+      if isinstance(result, OSError):
+         raise result
+      return result
+
+   def _lookup(self, key):
+      "start resolving, or join the lookup in progress; failures are returned"
+      if key not in self._lookups:
+         lookup = self._lookups[key] = self._spawn(self._resolve(key))
+         # also when the lookup is cancelled before it gets to run
+         lookup.add_done_callback(lambda lookup: self._forget(key, lookup))
+      return self._lookups[key]
+
+   def _forget(self, key, lookup):
+      if self._lookups.get(key) is lookup:
+         del self._lookups[key]
+
+   async def _resolve(self, key):
+      (host, port, family, type, proto, flags) = key
+      try:
+         result = await self.loop.getaddrinfo(host, port, family=family, type=type,
+                                              proto=proto, flags=flags)
+      except OSError as exc:
+         previous = self._entries.get(key)
+         if (previous is not None and not isinstance(previous[1], OSError)
+               and self.loop.time() - previous[0] < self.ttl + self.stale):
+            return previous[1] # keep serving the stale answer until it is too old
+         result = exc
+      self._entries[key] = (self.loop.time(), result)
+      return result
+
+   def clear(self):
+      "forget all cached answers"
+      self._entries.clear()
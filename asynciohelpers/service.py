@@ -1,13 +1,64 @@
 from contextlib import suppress
+import time
+import zlib
+import ssl
+import socket
 import asyncio
-from concurrent.futures import CancelledError
+from asyncio import CancelledError
+from concurrent.futures import ThreadPoolExecutor
 from .exceptions import SetupException
+from .policies import FixedDelay, ExponentialBackoff
+from .endpoints import EndpointSet, interleave_families, race_connections
+from .outbox import Outbox
+from .streams import MessageQueue
+from .protocols import MessageProtocol
+from .metrics import REGISTRY
+from .monitor import LagMonitor
+from .tls import ResumingContext, client_context, ssl_enabled
+from .resolver import CachingResolver
+
+
+SETUP_SECONDS = REGISTRY.histogram(
+   "asynciohelpers_setup_seconds", "Time spent in service setup.", ("service",))
+TEARDOWN_SECONDS = REGISTRY.histogram(
+   "asynciohelpers_teardown_seconds", "Time spent in service teardown.", ("service",))
+SHUTDOWN_SECONDS = REGISTRY.histogram(
+   "asynciohelpers_shutdown_seconds", "Time spent per shutdown phase.", ("service", "phase"))
+RUNNER_RESTARTS = REGISTRY.counter(
+   "asynciohelpers_runner_restarts_total", "Runner restarts after a failure.", ("service",))
+RECONNECTS = REGISTRY.counter(
+   "asynciohelpers_reconnects_total", "Reconnects after a lost connection.", ("service",))
+BYTES_SENT = REGISTRY.counter(
+   "asynciohelpers_sent_bytes_total", "Bytes written through send() or write().",
+   ("service",))
+WRITE_PAUSES = REGISTRY.counter(
+   "asynciohelpers_write_pauses_total", "Times send() waited for a paused transport.",
+   ("service",))
+WRITE_PAUSED_SECONDS = REGISTRY.counter(
+   "asynciohelpers_write_paused_seconds_total", "Time send() waited for paused transports.",
+   ("service",))
+TLS_HANDSHAKES = REGISTRY.counter(
+   "asynciohelpers_tls_handshakes_total", "TLS handshakes, full or resumed.", ("service", "kind"))
+BYTES_RECEIVED = REGISTRY.counter(
+   "asynciohelpers_received_bytes_total", "Bytes received as messages.", ("service",))
 
 
 class AsyncioRunning:
    "base runner class that sets up and runs the loop & payload"
 
-   RESTART_DELAY = 15 # seconds until waiter & runner are restarted
+   RUNNERS = ("_run",) # names of the runner coroutine methods, supervised
+   RESTART_STRATEGY = "one_for_one" # or "one_for_all": restart all runners if one fails
+   RESTART_POLICY = None # restart delay policy factory; default backs off to RESTART_DELAY
+   RESTART_DELAY = 15 # maximum seconds until a failed runner is restarted
+   MAX_RESTARTS = 5 # restarts allowed within RESTART_WINDOW before the service stops
+   RESTART_WINDOW = 60 # seconds
+   LAG_MONITOR = False # whether to watch the loop for lag and blocking calls
+   LAG_INTERVAL = 0.1 # seconds between loop lag samples
+   LAG_THRESHOLD = 0.5 # seconds the loop may be blocked before the stack is logged
+   SHUTDOWN_TIMEOUT = 10 # seconds allowed for teardown and draining tasks on stop
+   THREAD_WORKERS = 4 # threads used by offload()
+   PROCESS_WORKERS = None # processes used by offload_process(); None for one per CPU
+   OFFLOAD_LIMIT = None # concurrent calls per pool, others wait in the loop; None for pool size
 
    # these three required per the ABC
    _host = None
@@ -16,6 +67,11 @@ class AsyncioRunning:
 
    _loop = None
    _external_loop = False
+   _lag_monitor = None
+   _closing = False
+   _tasks = None
+   _teardown_task = None
+   _executors = None
 
 
    def set_loop(self, loop):
@@ -23,8 +79,157 @@ class AsyncioRunning:
       self._external_loop = True
 
 
+   def _spawn(self, coro, daemon=False):
+      """
+      create a task owned by this service; on shutdown, daemon tasks are
+      cancelled right away while others may complete until the deadline
+      """
+      if self._tasks is None:
+         self._tasks = {}
+      task = self._loop.create_task(coro)
+      self._tasks[task] = daemon
+      task.add_done_callback(self._forget_task)
+      return task
+
+
+   def _forget_task(self, task):
+      self._tasks.pop(task, None)
+
+
+   async def _timed(self, coro, histogram):
+      "run the coroutine, recording its duration in the histogram"
+      started = time.monotonic()
+      try:
+         return await coro
+      finally:
+         histogram.labels(self.__class__.__name__).observe(time.monotonic() - started)
+
+
+   def _new_restart_policy(self):
+      factory = type(self).RESTART_POLICY # not bound, so it may be a plain function
+      if factory is not None:
+         return factory()
+      return ExponentialBackoff(base=0.5, cap=self.RESTART_DELAY, jitter=None)
+
+
+   async def _supervise(self):
+      """
+      run the RUNNERS, restarting failed ones per RESTART_STRATEGY with backoff;
+      more than MAX_RESTARTS within RESTART_WINDOW stops the service
+      """
+
+      restarts = RUNNER_RESTARTS.labels(self.__class__.__name__)
+      policy = self._new_restart_policy()
+      policy.next_delay() # the first start is immediate
+      failures = []
+      running = {}
+
+      def start(names):
+         for name in names:
+            try:
+               running[self._spawn(getattr(self, name)(), daemon=True)] = name
+            except Exception as exc:
+               self._logger.error("cannot start runner %s, stopping: %s", name, exc)
+               self.stop()
+               return False
+         return True
+
+      try:
+         if not start(self.RUNNERS):
+            return
+         while running:
+            (done, pending) = await asyncio.wait(running, loop=self._loop,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+            failed = []
+            for task in done:
+               name = running.pop(task)
+               if task.cancelled():
+                  self._logger.debug("runner %s cancelled", name)
+               elif task.exception() is not None:
+                  self._logger.error("runner %s failure: %s", name, task.exception())
+                  failed.append(name)
+               else:
+                  self._logger.debug("runner %s finished", name)
+
+            if not failed or self._closing:
+               continue
+
+            now = self._loop.time()
+            failures = [when for when in failures if now - when < self.RESTART_WINDOW]
+            if not failures:
+               policy.succeeded()
+            failures.extend(now for name in failed)
+            if len(failures) > self.MAX_RESTARTS:
+               self._logger.error("%i runner failures within %s seconds, stopping",
+                                  len(failures), self.RESTART_WINDOW)
+               self.stop()
+               return
+
+            if self.RESTART_STRATEGY == "one_for_all":
+               for task in running:
+                  task.cancel()
+               await asyncio.gather(*running, loop=self._loop, return_exceptions=True)
+               running.clear()
+               failed = self.RUNNERS
+
+            policy.failed()
+            delay = policy.next_delay()
+            self._logger.info("restarting %s in %.1f seconds", ", ".join(failed), delay)
+            await asyncio.sleep(delay, loop=self._loop)
+            if self._closing:
+               return
+            restarts.inc(len(failed))
+            if not start(failed):
+               return
+      finally:
+         for task in running:
+            task.cancel()
+
+
+   def _get_executor(self, kind):
+      "return the (executor, semaphore) of kind 'thread' or 'process', creating it on first use"
+      if self._executors is None:
+         self._executors = {}
+      if kind not in self._executors:
+         if kind == "thread":
+            executor = ThreadPoolExecutor(self.THREAD_WORKERS,
+                                          thread_name_prefix=self.__class__.__name__)
+         else:
+            from concurrent.futures import ProcessPoolExecutor # imports multiprocessing
+            executor = ProcessPoolExecutor(self.PROCESS_WORKERS)
+         limit = asyncio.Semaphore(self.OFFLOAD_LIMIT or executor._max_workers, loop=self._loop)
+         self._executors[kind] = (executor, limit)
+      return self._executors[kind]
+
+
+   async def _offload(self, kind, fn, args):
+      (executor, limit) = self._get_executor(kind)
+      async with limit:
+         return await self._loop.run_in_executor(executor, fn, *args)
+
+
+   async def offload(self, fn, *args):
+      "run blocking fn(*args) in the service's thread pool and return its result"
+      return await self._offload("thread", fn, args)
+
+
+   async def offload_process(self, fn, *args):
+      "run CPU-bound fn(*args), which must be picklable, in the service's process pool"
+      return await self._offload("process", fn, args)
+
+
+   async def _shutdown_executors(self, timeout):
+      "shut the pools down, waiting off the loop for the calls in progress"
+      (executors, self._executors) = (self._executors, None)
+      shutdowns = [self._loop.run_in_executor(None, executor.shutdown)
+                   for (executor, limit) in executors.values()]
+      (done, pending) = await asyncio.wait(shutdowns, timeout=timeout, loop=self._loop)
+      if pending:
+         self._logger.warning("offloaded calls still running at the shutdown deadline")
+
+
    def _on_wait_completed(self, *args):
-      "also stop the runner when waiting is complete"
+      "also stop the runners when waiting is complete"
       self._closing = True
       try:
          self._run_task.cancel()
@@ -36,85 +241,132 @@ class AsyncioRunning:
    def start(self):
 
       self._loop = self._loop or asyncio.get_event_loop()
-      self._logger.debug("%s start requested" % self.__class__.__name__)
+      self._logger.debug("%s start requested", self.__class__.__name__)
 
       self._closing = False
       self._started = asyncio.Future(loop=self._loop)
+      self._teardown_task = None
+
+      if self.LAG_MONITOR:
+         self._lag_monitor = LagMonitor(self._loop, self.__class__.__name__,
+            self.LAG_INTERVAL, self.LAG_THRESHOLD, self._logger)
+         self._lag_monitor.start()
 
       # start the runner coro after setup is done, or exit if error
 
-      self._wait_task = self._loop.create_task(self._wait())
+      self._wait_task = self._spawn(self._wait(), daemon=True)
       self._wait_task.add_done_callback(self._on_wait_completed)
 
       def setup_complete(future):
          exc = future.exception()
          if exc:
-            self._logger.error("setup failed, stopping immediately: %s" % str(exc))
+            self._logger.error("setup failed, stopping immediately: %s", exc)
             setup_failed = SetupException("failure: %s" % str(exc))
             self._started.set_exception(setup_failed)
          else:
-            self._logger.debug("setup completed ok, scheduling runner")
-            self._run_task = self._loop.create_task(self._run())
+            self._logger.debug("setup completed ok, scheduling runners")
+            self._run_task = self._spawn(self._supervise(), daemon=True)
             self._started.set_result(True)
 
-      self._setup_task = self._loop.create_task(self._setup())
+      self._setup_task = self._spawn(self._timed(self._setup(), SETUP_SECONDS), daemon=True)
       self._setup_task.add_done_callback(setup_complete)
 
       if self._external_loop:
          return self._started
 
-      # run the setup
+      # run the setup, then the main loop; we can be stopped either by the waiter
+      # completing, by stop() or by the supervisor escalating, which all end the waiter
+
       try:
          self._loop.run_until_complete(self._setup_task)
       except Exception as exc:
          self._wait_task.cancel()
-         self._loop.call_soon_threadsafe(self._loop.stop)
 
-      # run the main loop; we can be stopped either by waiter completing & canceling
-      # runner or by stop(), which actually just cancels the waiter
+      try:
+         self._loop.run_until_complete(self._wait_task)
+      except CancelledError:
+         self._logger.info("waiter cancelled")
+      except KeyboardInterrupt:
+         self._logger.info("service terminated by user action")
+         self._wait_task.cancel()
+      except Exception as exc:
+         self._logger.error("waiter failure: %s", exc)
 
-      while not self._closing:
+      if self._lag_monitor is not None:
+         self._lag_monitor.stop()
+
+      self._loop.run_until_complete(self._shutdown())
+
+      # the loop is closed next, so cancel whatever else is still pending on it
+      remaining = [task for task in asyncio.all_tasks(self._loop)]
+      for task in remaining:
+         task.cancel()
+      if remaining:
+         self._logger.debug("cancelling %i tasks not owned by the service", len(remaining))
+         self._loop.run_until_complete(
+            asyncio.gather(*remaining, loop=self._loop, return_exceptions=True))
+
+      self._loop.close()
+      self._logger.info("%s is now shut down", self.__class__.__name__)
+
+      if self._started.done() and self._started.exception():
+         raise self._started.exception()
 
-         try:
-            self._loop.run_until_complete(self._run_task)
-         except CancelledError:
-            self._logger.info("runner cancelled")
-            break
-         except KeyboardInterrupt:
-            self._logger.info("runner terminated by user action")
-            self._wait_task.cancel()
-            break
-         except Exception as exc:
-            self._logger.error("runner failure: %s" % str(exc))
-            self._delaying = asyncio.sleep(self.RESTART_DELAY, loop=self._loop)
-            self._loop.run_until_complete(self._delaying)
-            if not self._closing:
-               self._run_task = self._loop.create_task(self._run())
 
-      self._teardown_task = self._loop.create_task(self._teardown())
+   async def _shutdown(self, timeout=None):
+      """
+      tear down, let the service's own tasks finish until SHUTDOWN_TIMEOUT (or
+      the timeout given) has passed, then cancel the remaining ones and shut the
+      executors down; other tasks on the loop are left alone, and the duration
+      of each phase is recorded
+      """
 
+      name = self.__class__.__name__
+      timings = self._shutdown_timings = {}
+      timeout = self.SHUTDOWN_TIMEOUT if timeout is None else timeout
+      deadline = self._loop.time() + timeout
+
+      started = time.monotonic()
       try:
-         self._loop.run_until_complete(self._teardown_task)
+         await asyncio.wait_for(self._timed(self._teardown(), TEARDOWN_SECONDS),
+                                timeout, loop=self._loop)
+      except asyncio.TimeoutError:
+         self._logger.warning("teardown did not complete in %.1f seconds", timeout)
       except Exception as exc:
-         self._logger.warn("teardown problem: %s" % exc)
-
-      remaining = asyncio.Task.all_tasks()
+         self._logger.warning("teardown problem: %s", exc)
+      timings["teardown"] = time.monotonic() - started
+
+      tasks = self._tasks or {}
+      for (task, daemon) in list(tasks.items()):
+         if daemon:
+            task.cancel()
+
+      started = time.monotonic()
+      draining = [task for (task, daemon) in tasks.items() if not daemon]
+      if draining:
+         timeout = max(deadline - self._loop.time(), 0)
+         (done, pending) = await asyncio.wait(draining, timeout=timeout, loop=self._loop)
+         if pending:
+            self._logger.warning("%i tasks still running at the shutdown deadline", len(pending))
+      timings["drain"] = time.monotonic() - started
+
+      started = time.monotonic()
+      remaining = list(tasks)
       for task in remaining:
          task.cancel()
+      if remaining:
+         await asyncio.gather(*remaining, loop=self._loop, return_exceptions=True)
+      timings["cancel"] = time.monotonic() - started
 
-      try:
-         self._loop.run_until_complete(asyncio.gather(*remaining))
-      except CancelledError:
-         pass
-      except Exception as exc:
-         self._logger.warn("cleanup failure: %s" % exc)
-      try:
-         self._loop.call_soon_threadsafe(self._loop.stop)
-      except Exception as exc:
-         self._logger.warn(str(exc))
+      if self._executors:
+         started = time.monotonic()
+         await self._shutdown_executors(max(deadline - self._loop.time(), 0))
+         timings["executors"] = time.monotonic() - started
 
-      self._loop.close()
-      self._logger.info("%s is now shut down" % self.__class__.__name__)
+      for (phase, duration) in timings.items():
+         SHUTDOWN_SECONDS.labels(name, phase).observe(duration)
+      self._logger.debug("shutdown took %.3fs (teardown %.3fs, drain %.3fs, cancel %.3fs)",
+         sum(timings.values()), timings["teardown"], timings["drain"], timings["cancel"])
 
 
    def stop(self, *args, **kwargs):
@@ -122,42 +374,313 @@ class AsyncioRunning:
 
       self._logger.info("stop requested")
       self._wait_task.cancel()
+      if self._lag_monitor is not None:
+         self._lag_monitor.stop()
 
       if self._external_loop:
-         self._teardown_task = self._loop.create_task(self._teardown())
+         if self._teardown_task is None:
+            self._teardown_task = self._loop.create_task(self._shutdown())
          return self._teardown_task
 
 
+AsyncioBase = AsyncioRunning # the name the tests and older code import
+
 
 class AsyncioConnecting(AsyncioRunning):
    "asyncio service that connects a given transport"
 
+   HAPPY_EYEBALLS_DELAY = 0.25 # seconds between staggered connection attempts
+   ENDPOINT_PENALTY = 30 # seconds a failed endpoint is passed over
+   SEND_QUEUE_SIZE = 1000 # messages queued by send() before it blocks
+   SEND_FLUSH_TIMEOUT = None # seconds stopping waits for sent data to go out and
+                             # transports to close; default half SHUTDOWN_TIMEOUT
+   WRITE_HIGH_WATER = None # transport write buffer limits in bytes;
+   WRITE_LOW_WATER = None  # None keeps the asyncio defaults
+   INBOUND_QUEUE_SIZE = 1000 # queued messages at which reading is paused
+   INBOUND_LOW_WATER = None # queued messages at which it resumes; default half
+   SSL_CAFILE = None # CA bundle to verify the server with; None for the system's
+   SSL_CERTFILE = None # client certificate, and
+   SSL_KEYFILE = None  # its key if not in the same file
+   SSL_CIPHERS = None # OpenSSL cipher list; None for the defaults
+   DNS_TTL = 300 # seconds resolved addresses are cached; 0 disables the cache
+   DNS_NEGATIVE_TTL = 5 # seconds a failure to resolve is cached
+   DNS_STALE = 300 # seconds past DNS_TTL addresses are used while being refreshed
+
    _transport_factory = None # protocol class, or other instance factory
    _host = None # FQDN
    _port = None # int
-   _ssl = False # bool
+   _ssl = False # bool, "true"/"false" string or an ssl.SSLContext
+   _endpoints = None # list of (host, port); defaults to [(_host, _port)]
+
+   _transport = None # connected transport and its protocol
+   _protocol = None
+   _endpoint_set = None
+   _resolver = None # a CachingResolver, which may be shared between services
+   _ssl_context = None
+   _outbound = None
+   _sender_task = None
+   _inbound = None
+
+   def _get_endpoints(self):
+      "return the endpoint set of this instance, creating it on first use"
+      if self._endpoint_set is None:
+         endpoints = self._endpoints or [(self._host, self._port)]
+         self._endpoint_set = EndpointSet(endpoints, penalty=self.ENDPOINT_PENALTY)
+      return self._endpoint_set
+
+   async def _resolve(self, endpoint):
+      "return the addresses to try for an endpoint, interleaving address families"
+      (host, port) = endpoint
+      if not self.DNS_TTL:
+         infos = await self._loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+      else:
+         if self._resolver is None:
+            self._resolver = CachingResolver(self._loop, self.DNS_TTL, self.DNS_NEGATIVE_TTL,
+               stale=self.DNS_STALE, spawn=lambda coro: self._spawn(coro, daemon=True))
+         infos = await self._resolver.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+      return [(endpoint, info) for info in interleave_families(infos)]
+
+   def _connector(self, endpoint, info):
+      """
+      return a coroutine function connecting to one resolved address, as is,
+      so that IPv6 flow info and scope id are kept; a failure marks the endpoint down
+      """
+      (family, type_, proto, canonname, sockaddr) = info
+      context = self._get_ssl_context()
+      kwargs = {"ssl": context}
+      if context is not None:
+         kwargs["server_hostname"] = endpoint[0]
+
+      async def connect():
+         sock = socket.socket(family, type_, proto)
+         try:
+            sock.setblocking(False)
+            await self._loop.sock_connect(sock, sockaddr)
+            return await self._loop.create_connection(self._new_protocol, sock=sock, **kwargs)
+         except CancelledError: # another attempt won the race
+            sock.close()
+            raise
+         except Exception:
+            sock.close()
+            self._get_endpoints().failed(endpoint)
+            raise
+
+      return connect
+
+   def _get_ssl_context(self):
+      "return the SSL context shared by all connections of this instance, or None"
+      if self._ssl_context is None:
+         if isinstance(self._ssl, ssl.SSLContext):
+            self._ssl_context = self._ssl
+         elif ssl_enabled(self._ssl):
+            self._ssl_context = client_context(
+               self.SSL_CAFILE, self.SSL_CERTFILE, self.SSL_KEYFILE, self.SSL_CIPHERS)
+         else:
+            return None
+         self._tls_stats = {"handshakes": 0, "resumed": 0}
+      return self._ssl_context
+
+   def _remember_session(self, transport, endpoint):
+      "keep the TLS session of a connection for resuming the next one"
+      ssl_object = transport.get_extra_info("ssl_object")
+      if ssl_object is not None and isinstance(self._ssl_context, ResumingContext):
+         self._ssl_context.remember(endpoint[0], ssl_object)
+
+   def _tls_connected(self, transport, endpoint):
+      ssl_object = transport.get_extra_info("ssl_object")
+      if ssl_object is None or self._ssl_context is None:
+         return
+      kind = "resumed" if ssl_object.session_reused else "full"
+      self._tls_stats["handshakes"] += 1
+      if ssl_object.session_reused:
+         self._tls_stats["resumed"] += 1
+      TLS_HANDSHAKES.labels(self.__class__.__name__, kind).inc()
+      self._remember_session(transport, endpoint)
+
+   def _new_protocol(self):
+      "create a protocol, wired to the service before it can receive anything"
+      protocol = self._transport_factory()
+      protocol.is_closed = asyncio.Future(loop=self._loop)
+      if isinstance(protocol, MessageProtocol):
+         protocol.inbound = self._get_inbound()
+      return protocol
+
+   async def _open_connection(self, slot=None):
+      "connect a new transport, returning it along with its protocol; slot is its pool slot"
+
+      endpoints = self._get_endpoints()
+      ordered = endpoints.ordered()
+      resolved = await asyncio.gather(*[self._resolve(endpoint) for endpoint in ordered],
+                                      loop=self._loop, return_exceptions=True)
+      candidates = []
+      for (endpoint, addresses) in zip(ordered, resolved):
+         if isinstance(addresses, Exception):
+            self._logger.warning("cannot resolve %s:%s: %s", endpoint[0], endpoint[1], addresses)
+            endpoints.failed(endpoint)
+         else:
+            candidates.extend(addresses)
+      if not candidates:
+         raise ConnectionError("no endpoint could be resolved")
+
+      connectors = [self._connector(*candidate) for candidate in candidates]
+      (index, (transport, protocol)) = await race_connections(
+         self._loop, connectors, self.HAPPY_EYEBALLS_DELAY)
+
+      endpoint = candidates[index][0]
+      endpoints.connected(endpoint)
+      if self.WRITE_HIGH_WATER is not None:
+         transport.set_write_buffer_limits(self.WRITE_HIGH_WATER, self.WRITE_LOW_WATER)
+      protocol.endpoint = endpoint
+      protocol.pool_slot = slot
+      self._tls_connected(transport, endpoint)
+      # TLS 1.3 servers send the session ticket after the handshake
+      protocol.is_closed.add_done_callback(
+         lambda future: self._remember_session(transport, endpoint))
+      self._logger.debug("connected transport (%s) to %s:%s",
+                         transport.__class__.__name__, *endpoint)
+      return (transport, protocol)
 
    async def _connect(self):
-      args = (self._transport_factory,)
-      kwargs = {"host": self._host, "port": self._port, "ssl": self._ssl}
-      connector = self._loop.create_connection(*args, **kwargs)
-      (self._transport, self._protocol) = await connector
-      self._protocol.is_closed = asyncio.Future(loop=self._loop)
-      self._logger.debug("connected transport (%s)" % self._transport.__class__.__name__)
+      (self._transport, self._protocol) = await self._open_connection()
+
+   def messages(self):
+      """
+      return the queue of received messages, to be consumed with `async for`;
+      only protocols derived from MessageProtocol put messages in it
+      """
+      factory = self._transport_factory
+      if isinstance(factory, type) and not issubclass(factory, MessageProtocol):
+         raise TypeError("%s is no MessageProtocol, so no messages are queued"
+                         % factory.__name__)
+      return self._get_inbound()
+
+   def _get_inbound(self):
+      if self._inbound is None:
+         self._inbound = MessageQueue(self._loop, self.INBOUND_QUEUE_SIZE,
+            self.INBOUND_LOW_WATER, BYTES_RECEIVED.labels(self.__class__.__name__))
+      return self._inbound
+
+   def _writer(self, key=None):
+      """
+      return the (transport, protocol) pair to write the next message to;
+      messages given the same key must go the same way while it is connected
+      """
+      return (self._transport, self._protocol)
+
+   async def send(self, data):
+      "queue data for writing, waiting while the outbound queue is full"
+
+      if self._outbound is None:
+         self._outbound = asyncio.Queue(self.SEND_QUEUE_SIZE, loop=self._loop)
+         self._send_stats = {"sent": 0, "bytes": 0, "pauses": 0,
+                             "queue_blocked": 0.0, "drain_blocked": 0.0}
+         self._bytes_sent = BYTES_SENT.labels(self.__class__.__name__)
+         self._write_pauses = WRITE_PAUSES.labels(self.__class__.__name__)
+         self._write_paused = WRITE_PAUSED_SECONDS.labels(self.__class__.__name__)
+         self._sender_task = self._spawn(self._sender(), daemon=True)
+
+      if self._outbound.full():
+         started = time.monotonic()
+         await self._outbound.put(data)
+         self._send_stats["queue_blocked"] += time.monotonic() - started
+      else:
+         self._outbound.put_nowait(data)
+
+   async def _drain(self, protocol):
+      "wait while the transport of the protocol is paused, if it does flow control"
+      if getattr(protocol, "_paused", False):
+         self._send_stats["pauses"] += 1
+         self._write_pauses.inc()
+         started = time.monotonic()
+         try:
+            await protocol.drain()
+         finally:
+            blocked = time.monotonic() - started
+            self._send_stats["drain_blocked"] += blocked
+            self._write_paused.inc(blocked)
+
+   async def _write(self, data):
+      "write one queued message once the transport accepts writes"
+      (transport, protocol) = self._writer()
+      await self._drain(protocol)
+      transport.write(data)
+      self._send_stats["sent"] += 1
+      self._send_stats["bytes"] += len(data)
+      self._bytes_sent.inc(len(data))
+
+   async def _sender(self):
+      "write queued data to the transport, waiting whenever it is paused"
+      while True:
+         data = await self._outbound.get()
+         try:
+            await self._write(data)
+         except CancelledError:
+            raise
+         except Exception as exc:
+            self._logger.warning("could not send: %s", exc)
+         finally:
+            self._outbound.task_done()
 
    async def _setup(self):
       self._logger.debug("connecting")
       await self._connect()
 
-   async def _teardown(self):
-      self._logger.debug("closing transport")
+   def _flush_timeout(self):
+      if self.SEND_FLUSH_TIMEOUT is None:
+         return self.SHUTDOWN_TIMEOUT / 2
+      return self.SEND_FLUSH_TIMEOUT
+
+   async def _flush_outbound(self, timeout):
+      "wait up to timeout seconds for the sender to write out everything queued so far"
+      if self._sender_task is None:
+         return
       try:
-         self._transport.close()
-      except Exception as exc:
-         self._logger.warn("cannot close transport: %s" % exc)
+         await asyncio.wait_for(self._outbound.join(), timeout, loop=self._loop)
+      except asyncio.TimeoutError:
+         self._logger.warning("dropping %i queued messages not sent within %s seconds",
+                              self._outbound.qsize(), timeout)
+      finally:
+         self._sender_task.cancel()
+
+   async def _close_transports(self, members, timeout):
+      "close the transports, aborting those not done writing out their buffers in time"
+
+      closing = {}
+      for (transport, protocol) in members:
+         if transport is None:
+            continue
+         try:
+            transport.close()
+         except Exception as exc:
+            self._logger.warning("cannot close transport: %s", exc)
+         else:
+            # protocol implementation MUST set this:
+            closing[protocol.is_closed] = transport
+      if not closing:
+         return
+
+      (done, pending) = await asyncio.wait(closing, timeout=timeout, loop=self._loop)
+      if pending:
+         self._logger.warning("aborting %i transports that did not close in %.1f seconds",
+                              len(pending), timeout)
+         for future in pending:
+            closing[future].abort()
+         await asyncio.wait(pending, loop=self._loop)
+
+   def _members(self):
+      "return the connected (transport, protocol) pairs, closed on teardown"
+      return [(self._transport, self._protocol)]
 
-      # protocol implementation MUST set this:
-      await self._protocol.is_closed
+   async def _teardown(self):
+      deadline = self._loop.time() + self._flush_timeout()
+      if self._inbound is not None:
+         self._inbound.close()
+      try:
+         await self._flush_outbound(self._flush_timeout())
+      finally:
+         members = self._members()
+         self._logger.debug("closing %i transports", len(members))
+         await self._close_transports(members, max(0, deadline - self._loop.time()))
 
 
 
@@ -165,35 +688,221 @@ class AsyncioReConnecting(AsyncioConnecting):
    "asyncio service that connects a given transport"
 
    RECONNECT_DELAY = 5 # seconds
+   RECONNECT_POLICY = None # policy class or factory; default waits RECONNECT_DELAY
+   OUTBOX_MEMORY_LIMIT = 1024 * 1024 # bytes held in memory while disconnected
+   OUTBOX_SPILL_SIZE = 64 * 1024 * 1024 # bytes of mmap ring file beyond that; 0 disables
+   OUTBOX_SPILL_PATH = None # ring file path; default is a temporary file
+   OUTBOX_FLUSH_BATCH = 64 * 1024 # bytes written per batch when flushing
+
+   _reconnect_policy = None
+   _outbox = None
+   _flush_task = None
+
+   def _new_reconnect_policy(self):
+      "create a new reconnect policy as configured for the class"
+      factory = type(self).RECONNECT_POLICY
+      return factory() if factory else FixedDelay(self.RECONNECT_DELAY)
+
+   def _get_reconnect_policy(self):
+      "return the reconnect policy of this instance, creating it on first use"
+      if self._reconnect_policy is None:
+         self._reconnect_policy = self._new_reconnect_policy()
+      return self._reconnect_policy
 
    async def _connect(self):
       "after super() setup has run, register a protocol close (re)connect callback"
 
-      await asyncio.sleep(self.RECONNECT_DELAY, loop=self._loop)
+      policy = self._get_reconnect_policy()
 
       while not self._closing:
+         delay = policy.next_delay()
+         if delay and self._get_endpoints().healthy():
+            # some endpoint has not failed recently, so fail over right away
+            delay = 0
+         if delay:
+            self._logger.debug("waiting %.2f seconds before connecting", delay)
+            await asyncio.sleep(delay, loop=self._loop)
+            if self._closing:
+               break
          self._logger.debug("attempting connect")
          try:
             result = await super()._connect()
          except ConnectionError as exc:
-            self._logger.warn("connection refused, retrying: %s" % str(exc))
+            self._logger.warning("connection refused, retrying: %s", exc)
          except CancelledError as exc:
-            self._logger.error("connect cancelled, stopping: %s" % str(exc))
+            self._logger.error("connect cancelled, stopping: %s", exc)
             break
          except SetupException as exc:
-            self._logger.error("setup failed: %s" % exc)
+            self._logger.error("setup failed: %s", exc)
             break
          except Exception as exc:
-            self._logger.error("unhandled error %s: %s" % (type(exc), exc))
+            self._logger.error("unhandled error %s: %s", type(exc), exc)
          else:
+            policy.succeeded()
             self._protocol.is_closed.add_done_callback(self._reconnect)
+            self._flush_outbox_soon()
             break
-         await asyncio.sleep(self.RECONNECT_DELAY, loop=self._loop)
+         policy.failed()
 
    def _reconnect(self, future):
       if not self._closing:
-         self._logger.warn("connection lost, reconnecting")
-         reconnect = self._loop.create_task(self._connect())
+         self._logger.warning("connection lost, reconnecting")
+         RECONNECTS.labels(self.__class__.__name__).inc()
+         self._get_endpoints().failed(self._protocol.endpoint)
+         reconnect = self._spawn(self._connect(), daemon=True)
       else:
-         self._logger.warn("already closing, not reconnecting")
+         self._logger.warning("already closing, not reconnecting")
+
+   def _disconnected(self):
+      transport = getattr(self, "_transport", None)
+      return transport is None or transport.is_closing()
+
+   async def _write(self, data):
+      "hold the message in the outbox while disconnected or still flushing it"
+
+      if self._outbox is None:
+         self._outbox = Outbox(self.OUTBOX_MEMORY_LIMIT, self.OUTBOX_SPILL_SIZE,
+                               self.OUTBOX_SPILL_PATH)
 
+      if len(self._outbox) or self._disconnected():
+         if not self._outbox.append(data):
+            self._logger.warning("outbox full, dropping message")
+         return
+
+      try:
+         await super()._write(data)
+      except ConnectionError:
+         self._outbox.append(data)
+
+   def _flush_outbox_soon(self):
+      if self._outbox and (self._flush_task is None or self._flush_task.done()):
+         self._flush_task = self._spawn(self._flush_outbox(), daemon=True)
+
+   async def _flush_outbox(self):
+      "write the messages held while disconnected, in order and in bulk"
+
+      self._logger.info("flushing %i messages held while disconnected", len(self._outbox))
+      while len(self._outbox) and not self._disconnected():
+         (transport, protocol) = self._writer()
+         await self._drain(protocol)
+         batch = self._outbox.batch(self.OUTBOX_FLUSH_BATCH)
+         transport.writelines(batch)
+         size = sum(len(data) for data in batch)
+         self._send_stats["sent"] += len(batch)
+         self._send_stats["bytes"] += size
+         self._bytes_sent.inc(size)
+
+   def _close_outbox(self):
+      if self._flush_task is not None:
+         self._flush_task.cancel()
+      if self._outbox is not None:
+         if len(self._outbox):
+            self._logger.warning("dropping %i messages held in outbox", len(self._outbox))
+         self._outbox.close()
+
+   async def _teardown(self):
+      try:
+         await super()._teardown()
+      finally:
+         self._close_outbox()
+
+
+class AsyncioPooledConnecting(AsyncioReConnecting):
+   "asyncio service that keeps a pool of transports connected to the same endpoint"
+
+   POOL_SIZE = 4 # number of connections to keep up
+   POOL_DISPATCH = "roundrobin" # or "leastbuffered"
+
+   _pool = () # connected (transport, protocol) members
+   _pool_tasks = () # the tasks maintaining them, one per slot
+
+   async def _connect(self):
+      "start maintaining the pool, returning once the first member is connected"
+
+      self._pool = []
+      self._pool_cursor = 0
+      self._pool_ready = asyncio.Future(loop=self._loop)
+      self._pool_tasks = [self._spawn(self._maintain(slot), daemon=True)
+                          for slot in range(self.POOL_SIZE)]
+      # the members give up only if the service is closing before any connected
+      await asyncio.wait([self._pool_ready] + self._pool_tasks, loop=self._loop,
+                         return_when=asyncio.FIRST_COMPLETED)
+
+   async def _maintain(self, slot):
+      "keep one pool member connected, replacing it whenever it is lost"
+
+      policy = self._new_reconnect_policy()
+
+      while not self._closing:
+         delay = policy.next_delay()
+         if delay:
+            await asyncio.sleep(delay, loop=self._loop)
+            if self._closing:
+               break
+         try:
+            member = await self._open_connection(slot)
+         except CancelledError:
+            break
+         except Exception as exc:
+            self._logger.warning("pool member %i cannot connect: %s", slot, exc)
+            policy.failed()
+            continue
+
+         policy.succeeded()
+         self._pool.append(member)
+         (self._transport, self._protocol) = self._pool[0]
+         self._flush_outbox_soon()
+         if not self._pool_ready.done():
+            self._pool_ready.set_result(True)
+
+         (transport, protocol) = member
+         await asyncio.shield(protocol.is_closed, loop=self._loop)
+
+         self._pool.remove(member)
+         if self._pool:
+            (self._transport, self._protocol) = self._pool[0]
+         if not self._closing:
+            self._logger.warning("pool member %i lost, replacing", slot)
+            RECONNECTS.labels(self.__class__.__name__).inc()
+
+   def _key_slot(self, key):
+      "return the pool slot that messages with the key go through"
+      if not isinstance(key, bytes):
+         key = str(key).encode("utf-8")
+      return zlib.crc32(key) % self.POOL_SIZE
+
+   def _writer(self, key=None):
+      "return the live pool member for the key if given, else as per the dispatch strategy"
+
+      if not self._pool:
+         raise ConnectionError("no pooled connection available")
+
+      if key is not None:
+         slot = self._key_slot(key)
+         for member in self._pool:
+            if member[1].pool_slot == slot:
+               return member
+         return self._pool[slot % len(self._pool)]
+
+      if self.POOL_DISPATCH == "leastbuffered":
+         return min(self._pool, key=lambda member: member[0].get_write_buffer_size())
+
+      self._pool_cursor = (self._pool_cursor + 1) % len(self._pool)
+      return self._pool[self._pool_cursor]
+
+   def write(self, data):
+      """
+      write data to one of the pooled transports at once, bypassing the bounded
+      queue and flow control of send(); for callers that throttle themselves
+      """
+      (transport, protocol) = self._writer()
+      transport.write(data)
+      BYTES_SENT.labels(self.__class__.__name__).inc(len(data))
+
+   def _members(self):
+      return list(self._pool)
+
+   async def _teardown(self):
+      for task in self._pool_tasks:
+         task.cancel() # lost members are not replaced any more
+      await super()._teardown()
@@ -0,0 +1,86 @@
+"""
+Inbound message queue with read-side backpressure.
+"""
+
+import asyncio
+from collections import deque
+
+
+class MessageQueue:
+   """
+   queue of received messages, consumed with `async for`; past the high water
+   mark the transports feeding it are paused until the consumer has brought
+   it down to the low water mark
+   """
+
+   def __init__(self, loop, high=1000, low=None, counter=None):
+      self._loop = loop
+      self._counter = counter # optional metrics counter of bytes received
+      self.high = high
+      self.low = high // 2 if low is None else low
+      self._messages = deque()
+      self._paused = set()
+      self._waiter = None
+      self._closed = False
+      self.stats = {"received": 0, "pauses": 0, "max_depth": 0}
+
+   def __len__(self):
+      return len(self._messages)
+
+   def put(self, message, transport=None):
+      "add a message, pausing the transport if the queue is full"
+
+      if self._closed:
+         return
+      self._messages.append(message)
+      self.stats["received"] += 1
+      if self._counter is not None:
+         self._counter.inc(len(message))
+      depth = len(self._messages)
+      if depth > self.stats["max_depth"]:
+         self.stats["max_depth"] = depth
+
+      if depth >= self.high and transport is not None and transport not in self._paused:
+         transport.pause_reading()
+         self._paused.add(transport)
+         self.stats["pauses"] += 1
+
+      self._wake()
+
+   def _wake(self):
+      waiter = self._waiter
+      self._waiter = None
+      if waiter is not None and not waiter.done():
+         waiter.set_result(None)
+
+   def _resume(self):
+      for transport in self._paused:
+         transport.resume_reading()
+      self._paused.clear()
+
+   async def get(self):
+      "return the next message; raises StopAsyncIteration once closed and empty"
+
+      while not self._messages:
+         if self._closed:
+            raise StopAsyncIteration
+         if self._waiter is None or self._waiter.done():
+            self._waiter = asyncio.Future(loop=self._loop)
+         await asyncio.shield(self._waiter, loop=self._loop)
+
+      message = self._messages.popleft()
+      if self._paused and len(self._messages) <= self.low:
+         self._resume()
+      return message
+
+   def close(self):
+      "stop accepting messages; consumers finish once the queue is empty"
+      self._closed = True
+      self._resume()
+      self._wake()
+
+   def __aiter__(self):
+      return self
+
+   async def __anext__(self):
+      return await self.get()
@@ -0,0 +1,146 @@
+"""
+Run several copies of a service, each in its own worker process and loop.
+"""
+
+import time
+import signal
+import asyncio
+import multiprocessing
+
+from .exceptions import SetupException
+from .policies import ExponentialBackoff
+from .util import loggerprovider
+
+
+SETUP_FAILED = 3 # worker exit status when service setup fails
+
+
+def run_worker(factory):
+   "worker process entry point: run one service instance in a fresh loop"
+
+   loop = asyncio.new_event_loop()
+   asyncio.set_event_loop(loop)
+   service = factory()
+   # stop() is called by the loop, not from within the signal handler
+   loop.add_signal_handler(signal.SIGTERM, service.stop)
+   signal.signal(signal.SIGINT, signal.SIG_IGN) # the supervisor coordinates shutdown
+   try:
+      service.start()
+   except SetupException:
+      raise SystemExit(SETUP_FAILED)
+
+
+@loggerprovider
+class ProcessSupervisor:
+   "run N copies of a service in worker processes, restarting crashed ones"
+
+   RESTART_POLICY = ExponentialBackoff # restart delay policy, per worker
+   STABLE_AFTER = 60 # seconds a worker must run before its backoff is reset
+   MAX_SETUP_FAILURES = 5 # setup failures in a row after which a worker is given up
+   DRAIN_TIMEOUT = 30 # seconds to wait for workers after forwarding SIGTERM
+   POLL_INTERVAL = 0.2 # seconds
+
+   def __init__(self, factory, workers=None):
+      self.factory = factory
+      self.workers = workers or multiprocessing.cpu_count()
+      self.exitcodes = {}
+      self._draining = False
+
+   def _spawn(self, index):
+      process = multiprocessing.Process(target=run_worker, args=(self.factory,),
+                                        name="%s-%i" % (self.factory.__name__, index))
+      process.start()
+      self._started_at[index] = time.monotonic()
+      self._logger.debug("started worker %i with pid %i", index, process.pid)
+      return process
+
+   def _drain(self, *args):
+      "signal handler: stop restarting and forward SIGTERM to the workers"
+      if not self._draining:
+         self._logger.info("draining %i workers", len(self._processes))
+         self._draining = True
+         self._deadline = time.monotonic() + self.DRAIN_TIMEOUT
+         for process in self._processes.values():
+            process.terminate()
+
+   def run(self):
+      "run the workers until they all exit or SIGTERM is received; return exit status"
+
+      self._processes = {}
+      self._started_at = {}
+      self._restart_at = {}
+      self._policies = {}
+      self._setup_failures = {}
+      self._killed = set()
+
+      handlers = {signum: signal.signal(signum, self._drain)
+                  for signum in (signal.SIGTERM, signal.SIGINT)}
+      try:
+         for index in range(self.workers):
+            self._policies[index] = type(self).RESTART_POLICY()
+            self._policies[index].next_delay()
+            self._processes[index] = self._spawn(index)
+         while self._processes or self._restart_at:
+            time.sleep(self.POLL_INTERVAL)
+            self._reap()
+            self._restart()
+            if self._draining and time.monotonic() > self._deadline:
+               for process in self._processes.values():
+                  if process.name not in self._killed:
+                     self._logger.warning("worker %s did not drain in time, killing",
+                                          process.name)
+                     self._killed.add(process.name)
+                     process.kill()
+      finally:
+         for (signum, handler) in handlers.items():
+            signal.signal(signum, handler)
+
+      return self.status()
+
+   def _reap(self):
+      "collect exited workers, scheduling restarts for crashed ones"
+
+      now = time.monotonic()
+      for (index, process) in list(self._processes.items()):
+         if process.is_alive():
+            continue
+         process.join()
+         del self._processes[index]
+         self.exitcodes[index] = process.exitcode
+         if self._draining or process.exitcode == 0:
+            self._logger.debug("worker %s exited (%s)", process.name, process.exitcode)
+            continue
+         if process.exitcode == SETUP_FAILED:
+            self._setup_failures[index] = self._setup_failures.get(index, 0) + 1
+            if self._setup_failures[index] >= self.MAX_SETUP_FAILURES:
+               self._logger.error("worker %s failed setup %i times in a row, giving up",
+                                  process.name, self._setup_failures[index])
+               continue
+         else:
+            self._setup_failures[index] = 0
+         policy = self._policies[index]
+         if now - self._started_at[index] > self.STABLE_AFTER:
+            policy.succeeded()
+         policy.failed()
+         delay = policy.next_delay()
+         self._logger.error("worker %s crashed (%s), restarting in %.1f seconds",
+                            process.name, process.exitcode, delay)
+         self._restart_at[index] = now + delay
+
+   def _restart(self):
+      now = time.monotonic()
+      for (index, when) in list(self._restart_at.items()):
+         if self._draining:
+            del self._restart_at[index]
+         elif now >= when:
+            del self._restart_at[index]
+            self._processes[index] = self._spawn(index)
+
+   def status(self):
+      "aggregate worker exit codes: zero if all succeeded, else the first failure"
+      for index in sorted(self.exitcodes):
+         code = self.exitcodes[index]
+         if code:
+            # a negative code means the worker was killed by that signal
+            return 128 - code if code < 0 else code
+      return 0
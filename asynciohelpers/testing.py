@@ -1,16 +1,13 @@
 from abc import abstractmethod, abstractproperty, ABCMeta
 
 import os, time, signal, logging
-import subprocess
 import asyncio
 import logging
-import socketserver
-import aiohttp
-import aiohttp.server
 
 from contextlib import contextmanager
 from asynciohelpers.util import loggerprovider
 from .util import logmethod, loggerprovider, logged
+from .protocols import FlowControlProtocol
 
 LOGLEVEL = logging.DEBUG
 
@@ -19,16 +16,16 @@ class LoggingServiceImpl():
    "provide the implementables"
 
    async def _setup(self):
-      self._logger.debug("%s setting up" % self.__class__.__name__)
+      self._logger.debug("%s setting up", self.__class__.__name__)
 
    async def _run(self):
-      self._logger.debug("%s runner running" % self.__class__.__name__)
+      self._logger.debug("%s runner running", self.__class__.__name__)
 
    async def _wait(self):
-      self._logger.debug("%s waiter started" % self.__class__.__name__)
+      self._logger.debug("%s waiter started", self.__class__.__name__)
 
    async def _teardown(self):
-      self._logger.debug("%s tearing down" % self.__class__.__name__)
+      self._logger.debug("%s tearing down", self.__class__.__name__)
 
 
 @logmethod("connection_lost")
@@ -44,13 +41,13 @@ class MockTransportServerProtocol(asyncio.Protocol):
       self._counter = 3
 
    def data_received(self, data):
-      self._logger.debug("receiveing data from client: %s" % str(data))
+      self._logger.debug("receiveing data from client: %s", data)
       self._counter -= 1
       if self._counter == 0:
          self._logger.debug("will not receive any more, closing")
          self._transport.close()
       else:
-         self._logger.debug("receiving %i more times" % self._counter)
+         self._logger.debug("receiving %i more times", self._counter)
 
 
 def get_socket_server(loop, host, port):
@@ -78,22 +75,23 @@ class MockTransportServerProtocol(asyncio.Protocol):
       self._counter = 3
 
    def data_received(self, data):
-      self._logger.debug("receiveing data from client: %s" % str(data))
+      self._logger.debug("receiveing data from client: %s", data)
       self._counter -= 1
       if self._counter == 0:
          self._logger.debug("will not receive any more, closing")
          self._transport.close()
       else:
-         self._logger.debug("receiving %i more times" % self._counter)
+         self._logger.debug("receiving %i more times", self._counter)
 
 
 @loggerprovider
-class CloseNotifyingProtocol:
+class CloseNotifyingProtocol(FlowControlProtocol):
 
    LOGLEVEL = LOGLEVEL
 
    @logged
    def connection_lost(self, exc):
+      super().connection_lost(exc)
       self.is_closed.set_result(True)
 
 
@@ -118,37 +116,65 @@ class TransportClientProtocol(CloseNotifyingProtocol, asyncio.Protocol):
       super().connection_lost(exc)
 
 
-@loggerprovider
-class TCPHandler(socketserver.BaseRequestHandler):
+# the request handlers are only built on first use, sparing everyone else
+# the import of socketserver and aiohttp
+
+def _tcp_handler():
+   import socketserver
+
+   @loggerprovider
+   class TCPHandler(socketserver.BaseRequestHandler):
+
+      def handle(self):
+      # self.request is the TCP socket connected to the client
+         while True:
+            data = self.request.recv(1024).strip()
+            if data:
+               self._logger.debug("data received from socket: %s", data)
+
+   return TCPHandler
+
+
+def _http_handler():
+   import aiohttp
+   import aiohttp.server
+
+   class SingleHTTPRequestHandler(aiohttp.server.ServerHttpProtocol):
+
+     async def handle_request(self, message, payload):
+         response = aiohttp.Response(
+             self.writer, 200, http_version=message.version
+         )
+         response.add_header('Content-Type', 'text/html')
+         response.add_header('Content-Length', '18')
+         response.send_headers()
+         response.write(b'<h1>It Works!</h1>')
+         await response.write_eof()
+
+         # after serving a single request, shut down
+         #self.shutdown()
 
-   def handle(self):
-   # self.request is the TCP socket connected to the client
-      while True:
-         data = self.request.recv(1024).strip()
-         if data:
-            self._logger.debug("data received from socket: %s" % data)
+   return SingleHTTPRequestHandler
 
 
-class SingleHTTPRequestHandler(aiohttp.server.ServerHttpProtocol):
+_LAZY = {"TCPHandler": _tcp_handler, "SingleHTTPRequestHandler": _http_handler}
 
-  async def handle_request(self, message, payload):
-      response = aiohttp.Response(
-          self.writer, 200, http_version=message.version
-      )
-      response.add_header('Content-Type', 'text/html')
-      response.add_header('Content-Length', '18')
-      response.send_headers()
-      response.write(b'<h1>It Works!</h1>')
-      await response.write_eof()
 
-      # after serving a single request, shut down
-      #self.shutdown()
+def __getattr__(name):
+   try:
+      factory = _LAZY[name]
+   except KeyError:
+      raise AttributeError("module %r has no attribute %r" % (__name__, name))
+   value = globals()[name] = factory()
+   value.__qualname__ = name
+   return value
 
 
 # context manager to start crossbar
 
 @contextmanager
 def crossbar_router():
+   import subprocess
    CBCMD = os.environ.get("CROSSBAR")
    assert CBCMD, "Must have environment variable CROSSBAR set to crossbar binary path"
    cdir = os.path.dirname(__file__)
@@ -170,6 +196,7 @@ class CrossbarRouter:
       self.loop = loop or asyncio.get_event_loop()
 
    async def __aenter__(self):
+      import subprocess
       CBCMD = os.environ.get("CROSSBAR")
       assert CBCMD, "Must have environment variable CROSSBAR set to crossbar binary path"
       cdir = os.path.dirname(__file__)
@@ -177,7 +204,7 @@ class CrossbarRouter:
       coro = asyncio.create_subprocess_exec(CBCMD, "start", "--cbdir", cdir, stdout=subprocess.DEVNULL, loop=self.loop)
       self.cbp = await coro
       await asyncio.sleep(3)
-      self._logger.debug("started WAMP router with pid %i" % self.cbp.pid)
+      self._logger.debug("started WAMP router with pid %i", self.cbp.pid)
 
    async def __aexit__(self, exc_type, exc, tb):
       self.cbp.terminate()
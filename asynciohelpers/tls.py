@@ -0,0 +1,52 @@
+"""
+Client SSL contexts that resume TLS sessions on reconnect.
+
+asyncio wraps each new connection with context.wrap_bio(); the context here
+passes it the last session seen for the server name, so that a reconnect
+can skip the full handshake.
+"""
+
+import ssl
+
+
+class ResumingContext(ssl.SSLContext):
+   "client context offering the last session per server name to new connections"
+
+   def __new__(cls, protocol=ssl.PROTOCOL_TLS_CLIENT, *args, **kwargs):
+      context = super().__new__(cls, protocol, *args, **kwargs)
+      context.sessions = {}
+      return context
+
+   def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None,
+                session=None):
+      if session is None and not server_side:
+         session = self.sessions.get(server_hostname)
+      return super().wrap_bio(incoming, outgoing, server_side, server_hostname, session)
+
+   def remember(self, server_hostname, ssl_object):
+      "keep the session of a connection for the next one to the same server"
+      session = ssl_object.session
+      if session is not None:
+         self.sessions[server_hostname] = session
+
+
+def client_context(cafile=None, certfile=None, keyfile=None, ciphers=None):
+   "return a verifying ResumingContext, with the CA and client certificate given"
+
+   context = ResumingContext(ssl.PROTOCOL_TLS_CLIENT)
+   if cafile:
+      context.load_verify_locations(cafile)
+   else:
+      context.load_default_certs()
+   if certfile:
+      context.load_cert_chain(certfile, keyfile)
+   if ciphers:
+      context.set_ciphers(ciphers)
+   return context
+
+
+def ssl_enabled(value):
+   "interpret an _ssl setting, which may be a bool, context or environment string"
+   if isinstance(value, str):
+      return value.strip().lower() not in ("", "0", "false", "no", "off")
+   return bool(value)
@@ -1,10 +1,13 @@
 from abc import abstractproperty, abstractmethod
+from functools import wraps, update_wrapper, lru_cache
 import os, logging, signal, types
-from autobahn.websocket.util import parse_url
 
 
 def env_configured(cls):
-   "get _host, _port, and _ssl from CONNECT_HOST, CONNECT_PORT & CONNECT_SSL env vars"
+   """
+   get _host, _port, _ssl & _endpoints from CONNECT_HOST, CONNECT_PORT, CONNECT_SSL &
+   CONNECT_ENDPOINTS env vars, and SSL_* settings from CONNECT_SSL_* ones
+   """
 
    host = os.environ.get("CONNECT_HOST")
    if host:
@@ -15,12 +18,22 @@ def env_configured(cls):
    ssl = os.environ.get("CONNECT_SSL")
    if ssl:
       cls._ssl = ssl
+   endpoints = os.environ.get("CONNECT_ENDPOINTS")
+   if endpoints:
+      from .endpoints import parse_endpoints # only when configured, it imports asyncio
+      cls._endpoints = parse_endpoints(endpoints, default_port=cls._port)
+   for setting in ("SSL_CAFILE", "SSL_CERTFILE", "SSL_KEYFILE", "SSL_CIPHERS"):
+      value = os.environ.get("CONNECT_" + setting)
+      if value:
+         setattr(cls, setting, value)
    return cls
 
 
 def wamp_configured(cls):
    "get host, port & ssl from wmp_url"
 
+   from autobahn.websocket.util import parse_url
+
    (isSecureURL, host, port, resource, path, params) = parse_url(cls.wmp_url)
 
    cls._host = host
@@ -70,25 +83,48 @@ def loggerprovider(cls):
    return cls
 
 
-def logged(*args):
-   "decorate a method to log, optionally with a level"
+class _Logged:
+   """
+   method that logs being called, at a level of the logger of its instance;
+   while that level is disabled, getting it returns the bare method instead,
+   so calls cost nothing extra; the logger caches the decision until levels
+   are changed
+   """
+
+   def __init__(self, method, level, name):
+      update_wrapper(self, method)
+      self.method = method
+      self.level = level
+
+      @wraps(method)
+      def logging_method(instance, *args, **kwargs):
+         instance._logger.log(level, "%s called", name)
+         return method(instance, *args, **kwargs)
+
+      self.logging_method = logging_method
 
-   def wrapped(method, lvl):
+   def __get__(self, instance, owner):
+      if instance is None:
+         return self
+      if instance._logger.isEnabledFor(self.level):
+         return self.logging_method.__get__(instance, owner)
+      return self.method.__get__(instance, owner)
 
-      def wrapper(self, *args, **kwargs):
-         self._logger.log(lvl, "%s called" % method.__name__)
-         return method(self, *args, **kwargs)
+   def __call__(self, instance, *args, **kwargs):
+      return self.__get__(instance, type(instance))(*args, **kwargs)
 
-      return wrapper
+
+def logged(*args):
+   "decorate a method to log its calls, optionally at a level; see _Logged"
 
    if type(args[0]) == types.FunctionType:
       # no level given, args[0] is the decorated method
-      return wrapped(args[0], logging.DEBUG)
+      return _Logged(args[0], logging.DEBUG, args[0].__name__)
 
    else:
       # args[0] has level
       def deco(method):
-         return wrapped(method, args[0])
+         return _Logged(method, args[0], method.__name__)
 
       return deco
 
@@ -97,24 +133,63 @@ def logmethod(name, *args, **kwargs):
    "just add a logging method call, optionally with a level"
 
    lvl = args[0] if args else logging.DEBUG
-   async = True if kwargs.get("async") else False
+   is_async = True if kwargs.get("async") else False
 
    def deco(cls):
       "actual decorator"
 
-      def wrapper(self, *args, **kwargs):
-         self._logger.log(lvl, "%s called" % name)
-         if async:
-            yield
+      if is_async:
+         async def nothing(self, *args, **kwargs):
+            pass
+      else:
+         def nothing(self, *args, **kwargs):
+            pass
 
-      loggermethod =  types.MethodType(wrapper, cls)
-      setattr(cls, name, loggermethod)
+      nothing.__name__ = name
+      setattr(cls, name, _Logged(nothing, lvl, name))
 
       return cls
 
    return deco
 
 
+@lru_cache(maxsize=None)
+def _queue_handler_class():
+   "return the queue handler class, importing logging.handlers on first use"
+
+   from logging.handlers import QueueHandler
+
+   class LazyQueueHandler(QueueHandler):
+      "queue handler that leaves all formatting to the listener thread"
+
+      def prepare(self, record):
+         return record
+
+   return LazyQueueHandler
+
+
+def queued_logging(logger=None):
+   """
+   move the handlers of the logger (by default the root logger) to a listener
+   thread, so that handler I/O never blocks the event loop; records are
+   formatted in that thread too, so log arguments should not be mutated
+   after logging them; stop() the returned listener to flush at exit
+   """
+
+   from queue import SimpleQueue
+   from logging.handlers import QueueListener
+
+   logger = logger or logging.getLogger()
+   handlers = list(logger.handlers)
+   queue = SimpleQueue()
+   for handler in handlers:
+      logger.removeHandler(handler)
+   logger.addHandler(_queue_handler_class()(queue))
+   listener = QueueListener(queue, *handlers, respect_handler_level=True)
+   listener.start()
+   return listener
+
+
 def isabstractmethod(obj):
    is_function = isinstance(obj, types.FunctionType)
    has_name = obj.__class__.__name__ == "abstractmethod"
@@ -1,28 +1,576 @@
+import sys
+import json
 import asyncio
+import inspect
+from asyncio import CancelledError
+from collections import OrderedDict
 from autobahn.wamp.types import ComponentConfig
-from autobahn.asyncio.websocket import WampWebSocketClientFactory
+from autobahn.asyncio.websocket import WampWebSocketClientFactory, WampWebSocketClientProtocol
 from autobahn.websocket.util import parse_url
+from autobahn.wamp.exception import ApplicationError
+from .metrics import REGISTRY
+from .protocols import FlowControlProtocol
+
+
+SESSIONS_JOINED = REGISTRY.counter(
+   "asynciohelpers_wamp_sessions_joined_total", "WAMP sessions joined.", ("service",))
+PUBLISHED_EVENTS = REGISTRY.counter(
+   "asynciohelpers_wamp_published_events_total", "Events given to publish().",
+   ("service", "outcome"))
+PUBLISH_FRAMES = REGISTRY.counter(
+   "asynciohelpers_wamp_publish_frames_total", "WAMP PUBLISH messages sent.", ("service",))
+INVOCATIONS = REGISTRY.counter(
+   "asynciohelpers_wamp_invocations_total", "Invocations of limited procedures.",
+   ("service", "procedure", "outcome"))
+INVOCATION_SECONDS = REGISTRY.histogram(
+   "asynciohelpers_wamp_invocation_seconds", "Limited procedure latency, queueing included.",
+   ("service", "procedure"))
+INVOCATIONS_QUEUED = REGISTRY.gauge(
+   "asynciohelpers_wamp_invocations_queued", "Invocations waiting for their turn.",
+   ("service", "procedure"))
+SESSION_RESTORE_SECONDS = REGISTRY.histogram(
+   "asynciohelpers_wamp_session_restore_seconds",
+   "Time from connecting until all subscriptions and registrations were restored.",
+   ("service",))
+CACHED_CALLS = REGISTRY.counter(
+   "asynciohelpers_wamp_cached_calls_total", "call_cached() calls by result.",
+   ("service", "result"))
+SERIALIZER_CLASSES = {"msgpack": "MsgPackSerializer", "cbor": "CBORSerializer",
+                      "ubjson": "UBJSONSerializer", "json": "JsonSerializer"}
+
+
+def get_serializers(names, strict=True):
+   """
+   return instances of the named WAMP serializers, in order; serializer
+   instances are passed through, and unavailable ones are an error if strict
+   """
+   from autobahn.wamp import serializer
+
+   found = []
+   for name in names:
+      if not isinstance(name, str):
+         found.append(name)
+         continue
+      cls = getattr(serializer, SERIALIZER_CLASSES.get(name, ""), None)
+      if cls is not None:
+         found.append(cls())
+      elif strict:
+         raise ValueError("WAMP serializer %r is not available" % name)
+   if not found:
+      raise ValueError("none of the WAMP serializers %r is available" % (names,))
+   return found
+
+
+class WAMPClientProtocol(WampWebSocketClientProtocol, FlowControlProtocol):
+   "WAMP over WebSocket client protocol that tracks transport write flow control"
+
+   is_closed = None # set by the connecting service
+   restored = False # whether the service has replayed its registry on this session
+
+   def connection_lost(self, exc):
+      FlowControlProtocol.connection_lost(self, exc)
+      super().connection_lost(exc)
+      if self.is_closed is not None and not self.is_closed.done():
+         self.is_closed.set_result(True)
+
+
+class CoalescingPublisher:
+   """
+   collect events and publish them once per loop tick or time window; by
+   default that is only a flush delay, each event still being one WAMP
+   message; with batch, one message per topic carries the list of events, or
+   with merge only the latest event is sent; sending waits while the
+   WebSocket transport is paused
+   """
+
+   def __init__(self, service, window=0, merge=False, max_pending=10000, batch=False):
+      self.service = service
+      self.window = window # seconds to collect events for; 0 for one loop tick
+      self.merge = merge
+      self.batch = batch # subscribers then get a list of events, even of one
+      self.max_pending = max_pending # events queued before publish() blocks
+      self._pending = {} # topic: list of events, or (latest event, events) if merging
+      self._queued = 0
+      self._flush_task = None
+      self._room = None
+      self.stats = {"events": 0, "frames": 0, "dropped": 0}
+      self._saved = 0
+      name = service.__class__.__name__
+      self._events = {outcome: PUBLISHED_EVENTS.labels(name, outcome)
+                      for outcome in ("published", "dropped")}
+      self._frames = PUBLISH_FRAMES.labels(name)
+
+   @property
+   def saved(self):
+      "number of messages saved by batching or merging events that were sent; 0 without either"
+      return self._saved
+
+   async def publish(self, topic, event):
+      "queue an event for the topic, waiting while max_pending events are queued"
+
+      while self._queued >= self.max_pending:
+         if self._room is None or self._room.done():
+            self._room = asyncio.Future(loop=self.service._loop)
+         await asyncio.shield(self._room, loop=self.service._loop)
+
+      if self.merge:
+         (latest, merged) = self._pending.get(topic, (None, 0))
+         self._queued += not merged
+         self._pending[topic] = (event, merged + 1)
+      else:
+         self._pending.setdefault(topic, []).append(event)
+         self._queued += 1
+      self.stats["events"] += 1
+      if self._flush_task is None:
+         self._flush_task = self.service._spawn(self._flush())
+
+   async def flush(self):
+      "wait until the events queued so far have been sent"
+      while self._flush_task is not None:
+         await asyncio.shield(self._flush_task, loop=self.service._loop)
+
+   async def _flush(self):
+      try:
+         await asyncio.sleep(self.window, loop=self.service._loop)
+         (pending, self._pending, self._queued) = (self._pending, {}, 0)
+         if self._room is not None and not self._room.done():
+            self._room.set_result(None)
+         for (topic, events) in pending.items():
+            await self._send(topic, events)
+      finally:
+         self._flush_task = None
+      if self._pending:
+         self._flush_task = self.service._spawn(self._flush())
+
+   async def _send(self, topic, events):
+      if self.merge:
+         messages = [events] # the latest event only, and how many it stands for
+      elif self.batch:
+         messages = [(events, len(events))]
+      else:
+         messages = [(event, 1) for event in events]
+
+      for (index, (payload, count)) in enumerate(messages):
+         try:
+            (transport, protocol) = self.service._writer(topic) # keeps the order per topic
+            await protocol.drain()
+            protocol._session.publish(topic, payload)
+         except Exception as exc:
+            count = sum(count for (payload, count) in messages[index:])
+            self.service._logger.warning("dropped %i events to %s: %s", count, topic, exc)
+            self.stats["dropped"] += count
+            self._events["dropped"].inc(count)
+            return
+         self.stats["frames"] += 1
+         self._saved += count - 1
+         self._frames.inc()
+         self._events["published"].inc(count)
+
+
+class ConcurrencyLimiter:
+   """
+   procedure endpoint wrapper running at most concurrency invocations at a
+   time; up to queue_size more wait their turn, and the rest are rejected
+   """
+
+   def __init__(self, service, procedure, endpoint, concurrency, queue_size,
+                error="asynciohelpers.error.overloaded"):
+      self.procedure = procedure
+      self.endpoint = endpoint
+      self.queue_size = queue_size
+      self.error = error
+      self._slots = asyncio.Semaphore(concurrency, loop=service._loop)
+      self._waiting = 0
+      self.stats = {"ok": 0, "failed": 0, "rejected": 0}
+      labels = (service.__class__.__name__, procedure)
+      self._outcomes = {outcome: INVOCATIONS.labels(*labels + (outcome,))
+                        for outcome in self.stats}
+      self._latency = INVOCATION_SECONDS.labels(*labels)
+      self._queued = INVOCATIONS_QUEUED.labels(*labels)
+      self._loop = service._loop
+
+   def _count(self, outcome):
+      self.stats[outcome] += 1
+      self._outcomes[outcome].inc()
+
+   async def __call__(self, *args, **kwargs):
+      if self._slots.locked() and self._waiting >= self.queue_size:
+         self._count("rejected")
+         raise ApplicationError(self.error, "%s is overloaded" % self.procedure)
+
+      started = self._loop.time()
+      self._waiting += 1
+      self._queued.inc()
+      try:
+         await self._slots.acquire()
+      finally:
+         self._waiting -= 1
+         self._queued.dec()
+      try:
+         result = self.endpoint(*args, **kwargs)
+         if inspect.isawaitable(result):
+            result = await result
+      except Exception:
+         self._count("failed")
+         raise
+      else:
+         self._count("ok")
+         return result
+      finally:
+         self._slots.release()
+         self._latency.observe(self._loop.time() - started)
+
+
+def _sizeof(value):
+   "rough memory footprint of a call result"
+   size = sys.getsizeof(value)
+   if isinstance(value, dict):
+      size += sum(_sizeof(key) + _sizeof(item) for (key, item) in value.items())
+   elif isinstance(value, (list, tuple)):
+      size += sum(_sizeof(item) for item in value)
+   return size
+
+
+def _procedures(names):
+   "procedure names in event arguments, which may be lists of them, as publish() batches"
+   for name in names:
+      if isinstance(name, (list, tuple)):
+         yield from _procedures(name)
+      else:
+         yield name
+
+
+class CallCache:
+   """
+   results of idempotent calls, kept for a per-procedure time, least recently
+   used evicted first to stay within max_bytes; identical calls in progress
+   at the same time share one RPC
+   """
+
+   def __init__(self, service, ttl=60, ttls=None, max_bytes=16 * 1024 * 1024):
+      self.service = service
+      self.ttl = ttl
+      self.ttls = ttls or {}
+      self.max_bytes = max_bytes
+      self.bytes = 0
+      self._entries = OrderedDict() # key: (procedure, expires, size, result)
+      self._calls = {} # key: task of the call in progress
+      self._generations = {} # procedure: invalidations; None counts those of all
+      self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+      name = service.__class__.__name__
+      self._counts = {result: CACHED_CALLS.labels(name, result)
+                      for result in ("hits", "misses", "coalesced")}
+
+   @property
+   def hit_rate(self):
+      calls = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+      return (self.stats["hits"] + self.stats["coalesced"]) / calls if calls else 0.0
+
+   def _count(self, result):
+      self.stats[result] += 1
+      self._counts[result].inc()
+
+   def _generation(self, procedure):
+      return (self._generations.get(None, 0), self._generations.get(procedure, 0))
+
+   async def call(self, procedure, *args, **kwargs):
+      "call the procedure, or return its cached result for these arguments"
+
+      key = json.dumps([procedure, args, kwargs], sort_keys=True, default=repr)
+      entry = self._entries.get(key)
+      if entry is not None:
+         if entry[1] > self.service._loop.time():
+            self._entries.move_to_end(key)
+            self._count("hits")
+            return entry[3]
+         self._remove(key)
+
+      if key in self._calls:
+         self._count("coalesced")
+      else:
+         self._count("misses")
+         self._calls[key] = self.service._spawn(
+            self._call(key, procedure, args, kwargs), daemon=True)
+      return await asyncio.shield(self._calls[key], loop=self.service._loop)
+
+   async def _call(self, key, procedure, args, kwargs):
+      generation = self._generation(procedure)
+      try:
+         result = await self.service._session().call(procedure, *args, **kwargs)
+      finally:
+         del self._calls[key]
+      if generation == self._generation(procedure): # not invalidated meanwhile
+         size = _sizeof(key) + _sizeof(result)
+         expires = self.service._loop.time() + self.ttls.get(procedure, self.ttl)
+         self._entries[key] = (procedure, expires, size, result)
+         self.bytes += size
+         while self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.stats["evictions"] += 1
+      return result
+
+   def _remove(self, key):
+      (procedure, expires, size, result) = self._entries.pop(key)
+      self.bytes -= size
+
+   def invalidate(self, *procedures):
+      "forget the results of the given procedures or lists of them, or of all if none given"
+      everything = not procedures
+      procedures = {None} if everything else set(_procedures(procedures))
+      for procedure in procedures:
+         self._generations[procedure] = self._generations.get(procedure, 0) + 1
+      for (key, entry) in list(self._entries.items()):
+         if everything or entry[0] in procedures:
+            self._remove(key)
 
 
 class WAMPServiceMixin:
    "base mixin that provides WAMP configuration plus transport and component factory"
 
-   async def _setup(self):
-      await super()._setup()
-      await self._protocol.factory._session_joined
+   SERIALIZER_PREFERENCE = ("msgpack", "cbor", "ubjson", "json") # if wmp_serializers is None
+   JOIN_TIMEOUT = 10 # seconds from connecting until the session must have joined
+   PUBLISH_WINDOW = 0 # seconds publish() delays events for; 0 for one loop tick
+   PUBLISH_MERGE = False # publish only the latest event per topic
+   PUBLISH_BATCH = False # publish the list of events per topic, not each event
+   PUBLISH_MAX_PENDING = 10000 # events queued before publish() blocks
+   CALL_CACHE_TTL = 60 # seconds call_cached() keeps results, unless
+   CALL_CACHE_TTLS = {} # given here per procedure
+   CALL_CACHE_SIZE = 16 * 1024 * 1024 # approximate bytes of cached results
+   CALL_CACHE_INVALIDATE = None # topic whose events name procedures to forget; all if none
+   INVOCATION_CONCURRENCY = 10 # default invocations run at once per limited procedure
+   INVOCATION_QUEUE = 100 # default invocations waiting per procedure before rejecting
+   OVERLOAD_ERROR = "asynciohelpers.error.overloaded" # WAMP error URI of rejections
+   SUBSCRIPTIONS = {} # topic: name of the method its events go to, subscribed on every join
+   REGISTRATIONS = {} # procedure: name of the method registered for it on every join
+
+   _publisher = None
+   _call_cache = None
+   _limiters = None
+   _registry = None
+   _placed = None # registry key: (protocol, handle) of the session it is applied on
+   _sessions_up = 0 # joined sessions not lost yet
+
+   async def _open_connection(self, slot=None):
+      "connect and wait until the session has joined the realm and is restored, also on reconnect"
+      try:
+         return await self._open_session(slot)
+      except CancelledError:
+         raise
+      except Exception:
+         if slot is not None and not self._closing:
+            # until its own member is back, what it restores goes on another
+            self._spawn(self._fallback(self._homeless(slot)), daemon=True)
+         raise
+
+   async def _open_session(self, slot):
+      started = self._loop.time()
+      (transport, protocol) = await super()._open_connection(slot)
+      joined = protocol.factory._session_joined
+      await asyncio.wait([joined, protocol.is_closed], timeout=self.JOIN_TIMEOUT,
+                         loop=self._loop, return_when=asyncio.FIRST_COMPLETED)
+      if not joined.done():
+         transport.close()
+         if protocol.is_closed.done():
+            raise ConnectionError("connection lost before the session joined")
+         raise ConnectionError("session did not join within %s seconds" % self.JOIN_TIMEOUT)
+      SESSIONS_JOINED.labels(self.__class__.__name__).inc()
+      if not self._sessions_up and self._call_cache is not None:
+         self._call_cache.invalidate() # events may have been missed while none was up
+      self._sessions_up += 1
+      protocol.is_closed.add_done_callback(self._session_left)
+      if await self._restore(protocol):
+         SESSION_RESTORE_SECONDS.labels(self.__class__.__name__).observe(
+            self._loop.time() - started)
+      await self._joined(protocol._session)
+      return (transport, protocol)
+
+   def _session_left(self, is_closed):
+      self._sessions_up -= 1
+
+   async def _joined(self, session):
+      "called with each session that has (re)joined the realm, once it is restored"
+
+   def _get_registry(self):
+      "return the subscriptions and registrations to restore, declared ones first"
+      if self._registry is None:
+         self._registry = OrderedDict()
+         self._placed = {}
+         for (topic, name) in self.SUBSCRIPTIONS.items():
+            self._declare("subscribe", topic, getattr(self, name))
+         for (procedure, name) in self.REGISTRATIONS.items():
+            self._declare("register", procedure, getattr(self, name))
+         if self.CALL_CACHE_INVALIDATE:
+            self._declare("subscribe", self.CALL_CACHE_INVALIDATE, self._invalidate_cached)
+      return self._registry
+
+   def _declare(self, kind, uri, handler, options=None):
+      "add to the registry; a procedure has one endpoint, a topic any number of handlers"
+      key = (kind, uri) if kind == "register" else (kind, uri, handler)
+      self._get_registry()[key] = (kind, uri, handler, options)
+      return key
+
+   def _restores(self, protocol, uri):
+      "whether the session of protocol is the one the uri is restored on"
+      slot = getattr(protocol, "pool_slot", None)
+      return slot is None or self._key_slot(uri) == slot
+
+   def _live(self, protocol):
+      is_closed = getattr(protocol, "is_closed", None)
+      return is_closed is not None and not is_closed.done()
+
+   def _homeless(self, slot):
+      "return the keys of what the pool slot restores that no live session has"
+      return [key for (key, entry) in self._get_registry().items()
+              if self._key_slot(entry[1]) == slot
+              and not self._live(self._placed.get(key, (None, None))[0])]
+
+   def _stand_in(self, uri):
+      "return the live pool member to apply uri on while its own is down, or None"
+      members = [protocol for (transport, protocol) in self._pool if self._live(protocol)]
+      if not members:
+         return None
+      slot = self._key_slot(uri)
+      for protocol in members:
+         if protocol.pool_slot == slot:
+            return protocol
+      return members[slot % len(members)]
+
+   def _apply(self, session, entry):
+      (kind, uri, handler, options) = entry
+      if kind == "subscribe":
+         return session.subscribe(handler, uri, options=options)
+      return session.register(handler, uri, options=options)
+
+   async def _release(self, kind, placement):
+      "undo a placement, unless its session is gone anyway"
+      (protocol, handle) = placement
+      if handle is None or not self._live(protocol):
+         return
+      try:
+         await (handle.unregister() if kind == "register" else handle.unsubscribe())
+      except Exception as exc:
+         self._logger.warning("cannot release %s: %s", kind, exc)
+
+   async def _place(self, protocol, key):
+      "apply the registry entry on the session of protocol, then release it where it was before"
+
+      entry = self._registry[key]
+      previous = self._placed.get(key, (None, None))
+      self._placed[key] = (protocol, None)
+      try:
+         if entry[0] == "register": # a procedure can be registered only once
+            await self._release("register", previous)
+         handle = await self._apply(protocol._session, entry)
+      except Exception:
+         if self._placed.get(key, (None, None))[0] is protocol:
+            del self._placed[key]
+         raise
+      if self._placed.get(key, (None, None))[0] is not protocol:
+         await self._release(entry[0], (protocol, handle)) # placed elsewhere meanwhile
+      else:
+         self._placed[key] = (protocol, handle)
+         if entry[0] != "register":
+            await self._release(entry[0], previous)
+      return handle
+
+   async def _fallback(self, keys):
+      "place registry entries whose pool member is down on another member, if one is up"
+
+      moves = [(key, self._stand_in(self._registry[key][1])) for key in keys]
+      moves = [(key, protocol) for (key, protocol) in moves if protocol is not None]
+      results = await asyncio.gather(*[self._place(protocol, key) for (key, protocol) in moves],
+                                     loop=self._loop, return_exceptions=True)
+      for ((key, protocol), result) in zip(moves, results):
+         if isinstance(result, Exception):
+            self._logger.warning("cannot %s %s elsewhere: %s", key[0], key[1], result)
+      if moves:
+         self._logger.debug("placed %i entries on fallback members", len(moves))
+
+   def _rehome(self, protocol):
+      "once the pool member is lost, move what is applied on its session to live ones"
+      if not self._closing:
+         keys = [key for (key, placed) in self._placed.items() if placed[0] is protocol]
+         self._spawn(self._fallback(keys), daemon=True)
+
+   async def _restore(self, protocol):
+      "replay the registry on the new session of protocol at once; return whether all succeeded"
+
+      protocol.restored = True
+      registry = self._get_registry()
+      if getattr(protocol, "pool_slot", None) is not None and self._live(protocol):
+         protocol.is_closed.add_done_callback(lambda is_closed: self._rehome(protocol))
+      keys = [key for (key, entry) in registry.items() if self._restores(protocol, entry[1])]
+      entries = [registry[key] for key in keys]
+      results = await asyncio.gather(*[self._place(protocol, key) for key in keys],
+                                     loop=self._loop, return_exceptions=True)
+      failed = 0
+      for ((kind, uri, handler, options), result) in zip(entries, results):
+         if isinstance(result, Exception):
+            failed += 1
+            self._logger.error("cannot %s %s: %s", kind, uri, result)
+      self._logger.debug("restored %i of %i subscriptions and registrations",
+                         len(entries) - failed, len(entries))
+      return not failed
+
+   async def _declare_now(self, *entry):
+      "add to the registry and apply to the session that restores it, or stands in for it, if up"
+      key = self._declare(*entry)
+      try:
+         (transport, protocol) = self._writer(entry[1])
+      except ConnectionError:
+         return None
+      if transport is None or transport.is_closing() or not protocol.restored:
+         return None # it is applied when that session is restored
+      return await self._place(protocol, key)
+
+   async def subscribe(self, handler, topic, options=None):
+      """
+      subscribe handler to the topic now if connected, and again on every
+      rejoin; return the subscription, or None until connected
+      """
+      return await self._declare_now("subscribe", topic, handler, options)
+
+   async def register(self, endpoint, procedure, options=None):
+      """
+      register endpoint for the procedure now if connected, and again on
+      every rejoin; return the registration, or None until connected
+      """
+      return await self._declare_now("register", procedure, endpoint, options)
+
+   def _invalidate_cached(self, *procedures):
+      if self._call_cache is not None:
+         self._call_cache.invalidate(*procedures)
+
+   def _session(self, key=None):
+      """
+      return a joined session to use; with a pooled connecting service, the
+      same one for the same key, else the next as per POOL_DISPATCH
+      """
+      (transport, protocol) = self._writer(key)
+      session = getattr(protocol, "_session", None)
+      if session is None:
+         raise ConnectionError("no WAMP session")
+      return session
 
    @property
    def _transport_factory(self):
       "create and return the transport factory"
       try:
-         factory = WampWebSocketClientFactory(self._component, url=self.wmp_url, serializers=self.wmp_serializers, loop=self._loop)
+         factory = WampWebSocketClientFactory(self._component, url=self.wmp_url, serializers=self._serializers(), loop=self._loop)
       except Exception as exc:
          raise Exception("could not build transport factory: %s" % exc)
       else:
+         factory.protocol = WAMPClientProtocol
          factory._session_joined = asyncio.Future(loop=self._loop)
-         self._logger.info("WAMP connecting to %s, realm '%s'" % (self.wmp_url, self.wmp_realm))
+         self._logger.info("WAMP connecting to %s, realm '%s'", self.wmp_url, self.wmp_realm)
          return factory
 
+   def _serializers(self):
+      "return the serializers to offer: wmp_serializers, or the available preferred ones"
+      if self.wmp_serializers is None:
+         return get_serializers(self.SERIALIZER_PREFERENCE, strict=False)
+      return get_serializers(self.wmp_serializers)
+
    def _component(self):
       "component factory method that creates and returns the component"
 
@@ -40,6 +588,61 @@ class WAMPServiceMixin:
          return session
 
 
+   async def publish(self, topic, event):
+      "publish an event, coalesced with others to the same topic; see CoalescingPublisher"
+      if self._publisher is None:
+         self._publisher = CoalescingPublisher(self, self.PUBLISH_WINDOW, self.PUBLISH_MERGE,
+                                               self.PUBLISH_MAX_PENDING, self.PUBLISH_BATCH)
+      await self._publisher.publish(topic, event)
+
+
+   async def call_cached(self, procedure, *args, **kwargs):
+      "call an idempotent procedure through the cache; see CallCache"
+      if self._call_cache is None:
+         self._call_cache = CallCache(self, self.CALL_CACHE_TTL, self.CALL_CACHE_TTLS,
+                                      self.CALL_CACHE_SIZE)
+      return await self._call_cache.call(procedure, *args, **kwargs)
+
+
+   def limited(self, endpoint, procedure, concurrency=None, queue_size=None):
+      """
+      return endpoint wrapped in the ConcurrencyLimiter of the procedure, for
+      registering; the limiter, and so its stats, is kept across rejoins
+      """
+      if self._limiters is None:
+         self._limiters = {}
+      limiter = self._limiters.get(procedure)
+      if limiter is None:
+         limiter = self._limiters[procedure] = ConcurrencyLimiter(self, procedure, endpoint,
+            concurrency or self.INVOCATION_CONCURRENCY,
+            self.INVOCATION_QUEUE if queue_size is None else queue_size, self.OVERLOAD_ERROR)
+      limiter.endpoint = endpoint
+      return limiter
+
+
+   async def register_limited(self, endpoint, procedure, concurrency=None, queue_size=None,
+                              session=None):
+      """
+      register endpoint for the procedure with limited concurrency, see
+      limited(); on every rejoin as per register() unless a session is given
+      """
+      limiter = self.limited(endpoint, procedure, concurrency, queue_size)
+      if session is None:
+         return await self.register(limiter, procedure)
+      return await session.register(limiter, procedure)
+
+
+   async def _flush_outbound(self, timeout):
+      "publish the events collected so far first, within the same timeout"
+      deadline = self._loop.time() + timeout
+      if self._publisher is not None:
+         try:
+            await asyncio.wait_for(self._publisher.flush(), timeout, loop=self._loop)
+         except asyncio.TimeoutError:
+            self._logger.warning("events not published within %s seconds", timeout)
+      await super()._flush_outbound(max(deadline - self._loop.time(), 0))
+
+
    async def _wait(self):
       "default waiter"
       while True:
@@ -0,0 +1,175 @@
+"""
+Service running a resizable pool of worker tasks over a bounded queue.
+"""
+
+import asyncio
+from asyncio import CancelledError
+from abc import ABCMeta, abstractmethod
+
+from .service import AsyncioRunning
+from .metrics import REGISTRY
+
+
+ITEMS = REGISTRY.counter(
+   "asynciohelpers_items_total", "Items processed by worker pools.", ("service", "outcome"))
+ITEM_LATENCY = REGISTRY.histogram(
+   "asynciohelpers_item_latency_seconds", "Time from submit() to processed.", ("service",))
+
+
+class AsyncioWorkerPool(AsyncioRunning, metaclass=ABCMeta):
+   """
+   service whose workers take items submitted to a bounded queue and pass them
+   to _process; with BATCH_SIZE over one, _process gets a list of up to that
+   many items, collected for at most BATCH_WAIT seconds
+   """
+
+   RUNNERS = ("_run", "_run_workers")
+   WORKERS = 4 # initial number of worker tasks; see resize()
+   QUEUE_SIZE = 1000 # items queued by submit() before it blocks
+   ITEM_TIMEOUT = None # seconds allowed per _process call; None for no limit
+   BATCH_SIZE = 1 # maximum items per _process call
+   BATCH_WAIT = 0.05 # seconds to wait for a batch to fill up
+
+   _queue = None
+   _workers = None
+   _target = None
+
+   @abstractmethod
+   async def _process(self, item):
+      "process one item, or a list of items if BATCH_SIZE is over one"
+
+
+   def _get_queue(self):
+      "return the work queue, creating it and the pool state on first use"
+      if self._queue is None:
+         self._queue = asyncio.Queue(self.QUEUE_SIZE, loop=self._loop)
+         self._workers = set()
+         self._idle = set()
+         self._retiring = 0
+         self.stats = {"submitted": 0, "processed": 0, "failed": 0, "timeouts": 0,
+                       "batches": 0}
+         name = self.__class__.__name__
+         self._outcomes = {outcome: ITEMS.labels(name, outcome)
+                           for outcome in ("processed", "failed", "timeouts")}
+         self._latency = ITEM_LATENCY.labels(name)
+      return self._queue
+
+
+   async def submit(self, item):
+      "queue an item for the workers, waiting while the queue is full"
+      await self._get_queue().put((self._loop.time(), item))
+      self.stats["submitted"] += 1
+
+
+   def resize(self, workers):
+      """
+      set the number of worker tasks; idle surplus workers are stopped at once,
+      busy ones once they are done with their current item
+      """
+      self._get_queue()
+      self._target = workers
+      current = len(self._workers) - self._retiring
+      if workers >= current:
+         kept = min(self._retiring, workers - current)
+         self._retiring -= kept
+         for _ in range(workers - current - kept):
+            self._workers.add(self._spawn(self._worker(), daemon=True))
+      else:
+         surplus = current - workers
+         for task in list(self._idle)[:surplus]:
+            self._idle.discard(task)
+            self._workers.discard(task)
+            task.cancel()
+            surplus -= 1
+         self._retiring += surplus
+      self._logger.debug("worker pool resized to %i", workers)
+
+
+   async def _run_workers(self):
+      "runner starting the workers; they run as tasks of their own"
+      self.resize(self.WORKERS if self._target is None else self._target)
+      await asyncio.Future(loop=self._loop)
+
+
+   async def _worker(self):
+      queue = self._get_queue()
+      task = asyncio.current_task(loop=self._loop)
+      try:
+         while True:
+            batch = await self._take(queue, task)
+            try:
+               await self._handle(batch)
+            finally:
+               for _ in batch:
+                  queue.task_done()
+            if self._retiring:
+               self._retiring -= 1
+               return
+      finally:
+         self._workers.discard(task)
+
+
+   async def _take(self, queue, task):
+      "wait for an item, then gather more until the batch is full or BATCH_WAIT passes"
+
+      self._idle.add(task)
+      try:
+         batch = [await queue.get()]
+      finally:
+         self._idle.discard(task)
+
+      deadline = self._loop.time() + self.BATCH_WAIT
+      while len(batch) < self.BATCH_SIZE:
+         if not queue.empty():
+            batch.append(queue.get_nowait())
+            continue
+         remaining = deadline - self._loop.time()
+         if remaining <= 0:
+            break
+         try:
+            batch.append(await asyncio.wait_for(queue.get(), remaining, loop=self._loop))
+         except asyncio.TimeoutError:
+            break
+      return batch
+
+
+   async def _handle(self, batch):
+      items = [item for (submitted, item) in batch]
+      processing = self._process(items if self.BATCH_SIZE > 1 else items[0])
+      try:
+         if self.ITEM_TIMEOUT is None:
+            await processing
+         else:
+            await asyncio.wait_for(processing, self.ITEM_TIMEOUT, loop=self._loop)
+      except asyncio.TimeoutError:
+         self._logger.warning("processing %i items timed out", len(batch))
+         outcome = "timeouts"
+      except CancelledError:
+         raise
+      except Exception as exc:
+         self._logger.error("processing %i items failed: %s", len(batch), exc)
+         outcome = "failed"
+      else:
+         outcome = "processed"
+
+      now = self._loop.time()
+      self.stats[outcome] += len(batch)
+      self.stats["batches"] += 1
+      self._outcomes[outcome].inc(len(batch))
+      for (submitted, item) in batch:
+         self._latency.observe(now - submitted)
+
+
+   async def _shutdown(self, timeout=None):
+      """
+      let the workers finish the queued items first, for half of SHUTDOWN_TIMEOUT
+      at most; teardown and the remaining tasks get the rest of it
+      """
+      timeout = self.SHUTDOWN_TIMEOUT if timeout is None else timeout
+      deadline = self._loop.time() + timeout
+      if self._queue is not None and self._workers:
+         try:
+            await asyncio.wait_for(self._queue.join(), timeout / 2, loop=self._loop)
+         except asyncio.TimeoutError:
+            self._logger.warning("%i queued items left unprocessed", self._queue.qsize())
+      await super()._shutdown(max(deadline - self._loop.time(), 0))
@@ -0,0 +1,66 @@
+"""
+Report the import cost of each public asynciohelpers module.
+
+Each module is imported in a fresh interpreter run with `-X importtime`; the
+cumulative time of the module and its heaviest dependencies are printed.
+
+   python benchmarks/importtime.py [--runs N] [--top N] [module ...]
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+import pkgutil
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT) # measure the checkout this script is in
+
+import asynciohelpers
+
+
+def public_modules():
+   return ["asynciohelpers.%s" % info.name
+           for info in pkgutil.iter_modules(asynciohelpers.__path__)
+           if not info.name.startswith("_")]
+
+
+def measure(module):
+   "import module in a new interpreter; return {imported name: cumulative microseconds}"
+   result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                           stderr=subprocess.PIPE, universal_newlines=True, cwd=ROOT)
+   if result.returncode:
+      raise ImportError(result.stderr.strip().splitlines()[-1])
+   timings = {}
+   for line in result.stderr.splitlines():
+      if not line.startswith("import time:") or "[us]" in line:
+         continue
+      (own, cumulative, name) = line[len("import time:"):].split("|")
+      timings[name.strip()] = int(cumulative)
+   return timings
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+   parser.add_argument("modules", nargs="*", help="modules to measure; default all public")
+   parser.add_argument("--runs", type=int, default=5, help="imports per module (median)")
+   parser.add_argument("--top", type=int, default=3, help="heaviest dependencies shown")
+   args = parser.parse_args()
+
+   for module in args.modules or public_modules():
+      try:
+         runs = [measure(module) for _ in range(args.runs)]
+      except ImportError as exc:
+         print("%-32s  cannot import: %s" % (module, exc))
+         continue
+      median = {name: statistics.median(run.get(name, 0) for run in runs) for name in runs[0]}
+      print("%-32s %8.1f ms" % (module, median.pop(module) / 1000))
+      others = sorted(((value, name) for (name, value) in median.items()
+                       if not name.startswith("asynciohelpers")), reverse=True)
+      for (value, name) in others[:args.top]:
+         print("   %-29s %8.1f ms" % (name, value / 1000))
+
+
+if __name__ == "__main__":
+   main()
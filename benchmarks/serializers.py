@@ -0,0 +1,76 @@
+"""
+Compare the WAMP serializers available here on representative messages.
+
+For each message and serializer, prints the mean time to encode and decode
+the message and the size of its payload on the wire.
+
+   python benchmarks/serializers.py [--number N] [serializer ...]
+"""
+
+import os
+import sys
+import argparse
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT) # measure the checkout this script is in
+
+import txaio
+txaio.use_asyncio()
+
+from autobahn.wamp import message
+
+from asynciohelpers.wamp import SERIALIZER_CLASSES, get_serializers
+
+
+RECORD = {"id": 123456, "name": "sensor-42", "value": 21.5, "ok": True,
+          "tags": ["indoor", "floor-3"], "updated": "2016-12-08T12:00:00Z"}
+
+MESSAGES = {
+   "small event": lambda: message.Publish(1, "com.example.tick", args=[42]),
+   "record event": lambda: message.Publish(2, "com.example.record", args=[RECORD]),
+   "call result": lambda: message.Result(3, args=[[dict(RECORD, id=i) for i in range(100)]]),
+   "number list": lambda: message.Publish(4, "com.example.series",
+                                          args=[[i * 0.5 for i in range(1000)]]),
+   "binary blob": lambda: message.Publish(5, "com.example.blob", args=[bytes(4096)]),
+}
+
+
+def measure(serializer, build, number):
+   "return (encode seconds, decode seconds, payload bytes) for one message"
+
+   def encode():
+      serializer.serialize(build())
+
+   (payload, binary) = serializer.serialize(build())
+   def decode():
+      serializer.unserialize(payload, binary)
+
+   build_time = timeit.timeit(build, number=number)
+   encode_time = timeit.timeit(encode, number=number) - build_time
+   decode_time = timeit.timeit(decode, number=number)
+   return (encode_time / number, decode_time / number, len(payload))
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+   parser.add_argument("serializers", nargs="*", default=list(SERIALIZER_CLASSES),
+                       help="serializers to compare; default all available")
+   parser.add_argument("--number", type=int, default=2000, help="iterations per measurement")
+   args = parser.parse_args()
+
+   serializers = get_serializers(args.serializers, strict=False)
+   print("%-14s %-8s %12s %12s %10s" % ("message", "format", "encode us", "decode us", "bytes"))
+   for (name, build) in MESSAGES.items():
+      for serializer in serializers:
+         try:
+            (encode, decode, size) = measure(serializer, build, args.number)
+         except Exception as exc:
+            print("%-14s %-8s  cannot serialize: %s" % (name, serializer.SERIALIZER_ID, exc))
+            continue
+         print("%-14s %-8s %12.2f %12.2f %10i" % (name, serializer.SERIALIZER_ID,
+                                                  encode * 1e6, decode * 1e6, size))
+
+
+if __name__ == "__main__":
+   main()
@@ -6,6 +6,7 @@ import asyncio
 from asynciohelpers.util import loggerprovider, wamp_configured
 from asynciohelpers.service import AsyncioConnecting
 from asynciohelpers.service import AsyncioReConnecting
+from asynciohelpers.service import AsyncioPooledConnecting
 from asynciohelpers.wamp import WAMPServiceMixin
 from asynciohelpers.testing import LoggingServiceImpl, TransportClientProtocol
 from .config import TEST_HTTP_HOST, TEST_WAMP_HOST, TEST_WAMP_PORT, TEST_HTTP_PORT, LOGLEVEL
@@ -36,15 +37,24 @@ class ReConnectingAsyncioServer(AsyncioReConnecting, LoggingServiceImpl):
 
       while not self._closing:
          self._logger.debug("saying hello")
-         try:
-            self._transport.write(b"Hello world!")
-         except Exception as exc:
-            self._logger.warn("could not send: %s" % exc)
+         await self.send(b"Hello world!")
          await asyncio.sleep(2, loop=self._loop)
 
       self._logger.warn("runner stopped")
 
 
+@loggerprovider
+class PooledAsyncioServer(AsyncioPooledConnecting, LoggingServiceImpl):
+
+   _host = TEST_HTTP_HOST
+   _port = TEST_HTTP_PORT
+   _transport_factory = TransportClientProtocol
+
+   POOL_SIZE = 3
+
+   LOGLEVEL = LOGLEVEL
+
+
 @loggerprovider
 @wamp_configured
 class ConnectingWAMPService(WAMPServiceMixin, AsyncioConnecting, LoggingServiceImpl):
@@ -69,3 +79,18 @@ class ReConnectingWAMPService(WAMPServiceMixin, AsyncioReConnecting, LoggingServ
    wmp_serializers = None
 
    LOGLEVEL = LOGLEVEL
+
+
+@loggerprovider
+@wamp_configured
+class PooledWAMPService(WAMPServiceMixin, AsyncioPooledConnecting, LoggingServiceImpl):
+
+   wmp_url = "ws://%s:%i/ws" % (TEST_WAMP_HOST, TEST_WAMP_PORT)
+   wmp_realm = "realm1"
+   wmp_sessioncomponent = WAMPComponent
+   wmp_extra = None
+   wmp_serializers = None
+
+   POOL_SIZE = 3
+
+   LOGLEVEL = LOGLEVEL
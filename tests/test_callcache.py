@@ -0,0 +1,171 @@
+import asyncio, logging, types
+from pytest import mark
+
+from asynciohelpers.protocols import FlowControlProtocol
+from asynciohelpers.wamp import CallCache, CoalescingPublisher, WAMPServiceMixin
+from asynciohelpers.util import loggerprovider
+
+
+class CountingSession:
+
+   def __init__(self, loop):
+      self.loop = loop
+      self.calls = 0
+
+   async def call(self, procedure, *args):
+      self.calls += 1
+      await asyncio.sleep(0.05, loop=self.loop)
+      return {"procedure": procedure, "args": list(args), "payload": "x" * 1000}
+
+
+class FakeService:
+   "just what the cache uses of a WAMP service"
+
+   def __init__(self, loop):
+      self._loop = loop
+      self.session = CountingSession(loop)
+
+   def _spawn(self, coro, daemon=False):
+      return self._loop.create_task(coro)
+
+   def _session(self, key=None):
+      return self.session
+
+
+@mark.asyncio
+async def test_01_coalescing_ttl_and_invalidation(event_loop):
+
+   service = FakeService(event_loop)
+   cache = CallCache(service, ttl=60, ttls={"com.example.clock": 0.1})
+
+   results = await asyncio.gather(*[cache.call("com.example.config", "a") for _ in range(10)],
+                                  loop=event_loop)
+   assert service.session.calls == 1 and all(result == results[0] for result in results)
+   await cache.call("com.example.config", "a")
+   assert service.session.calls == 1
+   await cache.call("com.example.config", "b")
+   assert service.session.calls == 2
+   assert cache.stats == {"hits": 1, "misses": 2, "coalesced": 9, "evictions": 0}
+
+   await cache.call("com.example.clock")
+   await asyncio.sleep(0.15, loop=event_loop)
+   await cache.call("com.example.clock")
+   assert service.session.calls == 4
+
+   # a result arriving after an invalidation is not cached
+   pending = event_loop.create_task(cache.call("com.example.other"))
+   await asyncio.sleep(0.01, loop=event_loop)
+   cache.invalidate("com.example.config", "com.example.other")
+   await pending
+   await cache.call("com.example.other")
+   await cache.call("com.example.config", "a")
+   assert service.session.calls == 7
+
+
+@mark.asyncio
+async def test_02_lru_within_memory_bound(event_loop):
+
+   service = FakeService(event_loop)
+   cache = CallCache(service, max_bytes=10000)
+   for value in range(20):
+      await cache.call("com.example.config", value)
+      await cache.call("com.example.config", 0) # keep this one recently used
+   assert cache.bytes <= 10000
+   assert cache.stats["evictions"] > 0
+   calls = service.session.calls
+   await cache.call("com.example.config", 0)
+   assert service.session.calls == calls
+
+
+class DeliveringSession:
+   "passes published events on to the subscriber, as a router would"
+
+   def __init__(self, handler):
+      self.handler = handler
+
+   def publish(self, topic, *args):
+      self.handler(*args)
+
+
+@mark.parametrize("batch", (False, True))
+@mark.asyncio
+async def test_03_invalidation_events_from_publish(event_loop, batch):
+
+   service = FakeService(event_loop)
+   service._logger = logging.getLogger("test")
+   cache = CallCache(service)
+   protocol = FlowControlProtocol()
+   protocol._session = DeliveringSession(cache.invalidate)
+   service._writer = lambda key=None: (None, protocol)
+   publisher = CoalescingPublisher(service, batch=batch)
+
+   for procedure in ("com.example.a", "com.example.b", "com.example.c"):
+      await cache.call(procedure)
+   await publisher.publish("com.example.changed", "com.example.a")
+   await publisher.publish("com.example.changed", ["com.example.b"])
+   await publisher.flush()
+   assert publisher.stats["dropped"] == 0
+
+   calls = service.session.calls
+   for procedure in ("com.example.a", "com.example.b", "com.example.c"):
+      await cache.call(procedure)
+   assert service.session.calls == calls + 2
+
+
+class JoinedProtocol:
+
+   def __init__(self, loop):
+      self.factory = types.SimpleNamespace(_session_joined=loop.create_future())
+      self.factory._session_joined.set_result(True)
+      self.is_closed = loop.create_future()
+      self._session = CountingSession(loop)
+
+
+class JoinedConnecting:
+   "stands in for the connecting service, every session joining at once"
+
+   _closing = False
+
+   def __init__(self, loop):
+      self._loop = loop
+
+   def _spawn(self, coro, daemon=False):
+      return self._loop.create_task(coro)
+
+   async def _open_connection(self, slot=None):
+      return (None, JoinedProtocol(self._loop))
+
+
+@loggerprovider
+class JoiningService(WAMPServiceMixin, JoinedConnecting):
+   pass
+
+
+class CountingCache:
+
+   invalidations = 0
+
+   def invalidate(self, *procedures):
+      self.invalidations += 1
+
+
+@mark.asyncio
+async def test_04_cache_is_cleared_once_no_session_was_up(event_loop):
+
+   service = JoiningService(event_loop)
+   service._call_cache = cache = CountingCache()
+
+   (transport, first) = await service._open_connection()
+   (transport, second) = await service._open_connection()
+   assert cache.invalidations == 1 # not once per pooled session
+
+   first.is_closed.set_result(True)
+   await asyncio.sleep(0, loop=event_loop)
+   (transport, third) = await service._open_connection()
+   assert cache.invalidations == 1 # another session was up all along
+
+   second.is_closed.set_result(True)
+   third.is_closed.set_result(True)
+   await asyncio.sleep(0, loop=event_loop)
+   await service._open_connection()
+   assert cache.invalidations == 2
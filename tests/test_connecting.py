@@ -6,12 +6,12 @@ from asynciohelpers.exceptions import SetupException
 from asynciohelpers.testing import get_socket_server
 
 from .fixtures import with_mock_server
-from .servers import ConnectingAsyncioServer, ReConnectingAsyncioServer
+from .servers import ConnectingAsyncioServer, ReConnectingAsyncioServer, PooledAsyncioServer
 from .servers import ConnectingWAMPService, ReConnectingWAMPService
 from .config import TEST_HOST, TEST_PORT, logger
 
 
-tested_services = (ConnectingAsyncioServer, ReConnectingAsyncioServer, )
+tested_services = (ConnectingAsyncioServer, ReConnectingAsyncioServer, PooledAsyncioServer, )
 
 #ConnectingWAMPService, ReConnectingWAMPService)
 
@@ -69,3 +69,27 @@ def test_02_internal_loop_connect(servicefactory, with_mock_server):
 
 
 
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_03_pool_routes_keys_to_fixed_members(event_loop):
+
+   class LingeringPool(PooledAsyncioServer):
+      async def _wait(self):
+         await asyncio.sleep(60, loop=self._loop)
+
+   mock = await get_socket_server(event_loop, TEST_HOST, TEST_PORT)
+
+   server = LingeringPool()
+   server.set_loop(event_loop)
+   await server.start()
+   await asyncio.sleep(0.2, loop=event_loop)
+   assert len(server._pool) == PooledAsyncioServer.POOL_SIZE
+
+   keys = ["com.example.topic%i" % i for i in range(20)]
+   members = [server._writer(key) for key in keys]
+   assert [server._writer(key) for key in keys] == members
+   assert len(set(protocol.pool_slot for (transport, protocol) in members)) > 1
+
+   await server.stop()
+   mock.close()
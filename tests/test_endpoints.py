@@ -0,0 +1,99 @@
+import socket
+import asyncio
+from pytest import mark
+
+from asynciohelpers.endpoints import parse_endpoints, interleave_families, EndpointSet
+from asynciohelpers.endpoints import race_connections
+from .servers import ReConnectingAsyncioServer
+
+
+def closed_port():
+   with socket.socket() as sock:
+      sock.bind(("127.0.0.1", 0))
+      return sock.getsockname()[1]
+
+
+async def listening(loop):
+   "return a server accepting connections on a free local port, and the port"
+   server = await loop.create_server(asyncio.Protocol, "127.0.0.1", 0)
+   return (server, server.sockets[0].getsockname()[1])
+
+
+class Clock:
+
+   now = 0
+
+   def __call__(self):
+      return self.now
+
+
+def test_01_parse_endpoints():
+   spec = "a.example.com:8080, 10.0.0.1:81,[::1]:82,b.example.com"
+   assert parse_endpoints(spec, default_port=80) == [
+      ("a.example.com", 8080), ("10.0.0.1", 81), ("::1", 82), ("b.example.com", 80)]
+
+
+def test_02_interleave_families():
+   v4 = [(socket.AF_INET, None, None, "", ("10.0.0.%i" % i, 80)) for i in range(3)]
+   v6 = [(socket.AF_INET6, None, None, "", ("::%i" % i, 80, 0, 0)) for i in range(2)]
+   ordered = interleave_families(v6 + v4)
+   assert [info[0] for info in ordered] == [socket.AF_INET6, socket.AF_INET] * 2 + [socket.AF_INET]
+
+
+def test_03_failed_endpoint_is_passed_over():
+   clock = Clock()
+   endpoints = EndpointSet([("a", 1), ("b", 2), ("c", 3)], penalty=10, clock=clock)
+   assert endpoints.ordered() == [("a", 1), ("b", 2), ("c", 3)]
+   endpoints.failed(("a", 1))
+   assert endpoints.ordered() == [("b", 2), ("c", 3), ("a", 1)]
+   assert endpoints.healthy() == [("b", 2), ("c", 3)]
+   endpoints.connected(("c", 3))
+   assert endpoints.ordered() == [("c", 3), ("b", 2), ("a", 1)]
+   clock.now = 11
+   assert endpoints.ordered() == [("c", 3), ("a", 1), ("b", 2)]
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_04_race_starts_the_next_attempt_after_the_delay(event_loop):
+
+   (server, port) = await listening(event_loop)
+   hanging = event_loop.create_future()
+
+   async def blackholed():
+      try:
+         await asyncio.sleep(60, loop=event_loop)
+      finally:
+         hanging.set_result(True)
+
+   def live():
+      return event_loop.create_connection(asyncio.Protocol, "127.0.0.1", port)
+
+   started = event_loop.time()
+   (index, (transport, protocol)) = await race_connections(event_loop, [blackholed, live], 0.1)
+   assert index == 1
+   assert 0.1 <= event_loop.time() - started < 0.5
+   assert hanging.done() # the losing attempt is cancelled
+   transport.close()
+   server.close()
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_05_fail_over_to_the_live_endpoint(event_loop):
+
+   (server, port) = await listening(event_loop)
+   (dead, alive) = (("127.0.0.1", closed_port()), ("127.0.0.1", port))
+
+   class FailingOver(ReConnectingAsyncioServer):
+      _endpoints = [dead, alive]
+
+   service = FailingOver()
+   service.set_loop(event_loop)
+   await asyncio.wait_for(service._connect(), 2, loop=event_loop)
+   assert service._protocol.endpoint == alive
+   endpoints = service._get_endpoints()
+   assert not endpoints.is_healthy(dead) and endpoints.is_healthy(alive)
+   assert endpoints.ordered() == [alive, dead]
+
+   service._closing = True
+   service._transport.close()
+   server.close()
@@ -0,0 +1,92 @@
+import struct
+from pytest import raises
+
+from asynciohelpers.framing import LengthPrefixFramer, DelimiterFramer, FixedSizeFramer
+from asynciohelpers.framing import FramingError
+from asynciohelpers.protocols import FramedProtocol
+
+
+def feed(protocol, data, chunk):
+   "feed data to a buffered protocol the way a transport would"
+   for i in range(0, len(data), chunk):
+      piece = data[i:i + chunk]
+      while piece:
+         buffer = protocol.get_buffer(len(piece))
+         n = min(len(buffer), len(piece))
+         buffer[:n] = piece[:n]
+         protocol.buffer_updated(n)
+         piece = piece[n:]
+
+
+def collecting(framer, buffer_size=16):
+
+   class CollectingProtocol(FramedProtocol):
+
+      FRAMER = framer
+      BUFFER_SIZE = buffer_size
+      MAX_BUFFER_SIZE = 1024
+
+      def connection_made(self, transport):
+         self.frames = []
+
+      def frame_received(self, frame):
+         assert isinstance(frame, memoryview)
+         self.frames.append(bytes(frame))
+
+   protocol = CollectingProtocol()
+   protocol.connection_made(None)
+   return protocol
+
+
+def test_01_length_prefixed():
+   messages = [b"", b"a", b"hello world", b"x" * 100]
+   data = b"".join(struct.pack("!H", len(m)) + m for m in messages)
+   for chunk in (1, 3, 7, len(data)):
+      protocol = collecting(LengthPrefixFramer(header_size=2))
+      feed(protocol, data, chunk)
+      assert protocol.frames == messages
+
+
+def test_02_delimited():
+   for chunk in (1, 5, 64):
+      protocol = collecting(DelimiterFramer(b"\r\n"))
+      feed(protocol, b"one\r\ntwo\r\n\r\nthree is a longer line\r\nfour", chunk)
+      assert protocol.frames == [b"one", b"two", b"", b"three is a longer line"]
+
+
+def test_03_fixed_size():
+   protocol = collecting(FixedSizeFramer(4))
+   feed(protocol, b"aaaabbbbccccdd", 3)
+   assert protocol.frames == [b"aaaa", b"bbbb", b"cccc"]
+
+
+def test_04_oversized_frames_are_rejected():
+   protocol = collecting(LengthPrefixFramer(max_size=10))
+   with raises(FramingError):
+      feed(protocol, struct.pack("!I", 11) + b"x" * 11, 16)
+   protocol = collecting(DelimiterFramer(max_size=2000), buffer_size=16)
+   with raises(BufferError):
+      feed(protocol, b"x" * 1500, 100)
+   protocol = collecting(DelimiterFramer(max_size=10), buffer_size=16)
+   with raises(FramingError): # even with its delimiter at hand
+      feed(protocol, b"x" * 12 + b"\n", 13)
+
+
+class ScanCountingFramer(DelimiterFramer):
+
+   def __init__(self, *args, **kwargs):
+      super().__init__(*args, **kwargs)
+      self.scanned = 0
+
+   def frame(self, buffer, start, end, scanned=0):
+      self.scanned += end - max(start, start + scanned - len(self.delimiter) + 1)
+      return super().frame(buffer, start, end, scanned)
+
+
+def test_05_delimiter_search_resumes():
+   framer = ScanCountingFramer(b"\r\n")
+   protocol = collecting(framer)
+   line = b"y" * 500 + b"\r\n"
+   feed(protocol, line * 2, 1)
+   assert protocol.frames == [b"y" * 500] * 2
+   assert framer.scanned < 3 * len(line) * 2 # not rescanning from the start of the line
@@ -0,0 +1,67 @@
+import time, asyncio
+from pytest import mark, raises
+
+from asynciohelpers.group import ServiceGroup
+from asynciohelpers.service import AsyncioRunning
+from asynciohelpers.exceptions import SetupException
+from asynciohelpers.util import loggerprovider
+from asynciohelpers.testing import LoggingServiceImpl
+
+
+@loggerprovider
+class SlowService(AsyncioRunning, LoggingServiceImpl):
+
+   def __init__(self, name, setup_time, events, fail=False):
+      self.name = name
+      self.setup_time = setup_time
+      self.events = events
+      self.fail = fail
+
+   async def _setup(self):
+      self.events.append(("setup", self.name))
+      await asyncio.sleep(self.setup_time, loop=self._loop)
+      if self.fail:
+         raise Exception("setup of %s failed" % self.name)
+      self.events.append(("ready", self.name))
+
+   async def _wait(self):
+      await asyncio.sleep(60, loop=self._loop)
+
+   async def _teardown(self):
+      self.events.append(("teardown", self.name))
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_01_concurrent_setup_in_dependency_order(event_loop):
+
+   events = []
+   group = ServiceGroup(event_loop)
+   db = group.add(SlowService("db", 0.2, events))
+   cache = group.add(SlowService("cache", 0.2, events))
+   wamp = group.add(SlowService("wamp", 0.1, events), after=(db,))
+
+   started = time.monotonic()
+   await group.start()
+   assert time.monotonic() - started < 0.4 # the longest chain, not the sum
+   assert events.index(("ready", "db")) < events.index(("setup", "wamp"))
+
+   await group.stop()
+   teardowns = [name for (event, name) in events if event == "teardown"]
+   assert teardowns.index("wamp") < teardowns.index("db")
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_02_failure_stops_the_started(event_loop):
+
+   events = []
+   group = ServiceGroup(event_loop)
+   db = group.add(SlowService("db", 0.1, events, fail=True))
+   cache = group.add(SlowService("cache", 0.1, events))
+   wamp = group.add(SlowService("wamp", 0.1, events), after=(db,))
+
+   with raises(SetupException):
+      await group.start()
+   assert ("setup", "wamp") not in events
+   assert ("teardown", "cache") in events
+   with raises(ValueError):
+      group.add(SlowService("orphan", 0, events), after=(SlowService("x", 0, events),))
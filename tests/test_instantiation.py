@@ -5,13 +5,14 @@ from asynciohelpers.service import AsyncioBase
 from asynciohelpers.exceptions import SetupException
 
 from .fixtures import with_mock_server
-from .servers import ConnectingAsyncioServer, ReConnectingAsyncioServer
+from .servers import ConnectingAsyncioServer, ReConnectingAsyncioServer, PooledAsyncioServer
 from .servers import ConnectingWAMPService, ReConnectingWAMPService
 from .config import TEST_HOST, TEST_PORT, logger
 
 
 tested_services = (ConnectingAsyncioServer,
                    ReConnectingAsyncioServer,
+                   PooledAsyncioServer,
                    ConnectingWAMPService,
                    ReConnectingWAMPService
                    )
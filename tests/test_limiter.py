@@ -0,0 +1,42 @@
+import asyncio
+from pytest import mark, raises
+
+from autobahn.wamp.exception import ApplicationError
+from asynciohelpers.wamp import ConcurrencyLimiter
+
+
+class FakeService:
+
+   def __init__(self, loop):
+      self._loop = loop
+
+
+@mark.asyncio
+async def test_01_limit_queue_and_reject(event_loop):
+
+   active = []
+   peak = []
+
+   async def slow(value):
+      active.append(value)
+      peak.append(len(active))
+      await asyncio.sleep(0.05, loop=event_loop)
+      active.remove(value)
+      return value * 2
+
+   limiter = ConcurrencyLimiter(FakeService(event_loop), "com.example.slow", slow,
+                                concurrency=2, queue_size=2)
+   results = await asyncio.gather(*[limiter(value) for value in range(6)],
+                                  loop=event_loop, return_exceptions=True)
+
+   assert results[:4] == [0, 2, 4, 6]
+   assert all(isinstance(result, ApplicationError) for result in results[4:])
+   assert results[4].error == "asynciohelpers.error.overloaded"
+   assert max(peak) == 2
+   assert limiter.stats == {"ok": 4, "failed": 0, "rejected": 2}
+   assert limiter._queued.value == 0
+
+   limiter.endpoint = lambda: 1 / 0
+   with raises(ZeroDivisionError):
+      await limiter()
+   assert limiter.stats["failed"] == 1
@@ -0,0 +1,57 @@
+import logging, threading
+
+from asynciohelpers.util import loggerprovider, logged, logmethod, queued_logging
+
+
+class RecordingHandler(logging.Handler):
+
+   def __init__(self):
+      super().__init__()
+      self.records = []
+      self.threads = set()
+
+   def emit(self, record):
+      self.records.append(record.getMessage())
+      self.threads.add(threading.get_ident())
+
+
+@logmethod("touched")
+@loggerprovider
+class Logging:
+
+   LOGLEVEL = logging.INFO
+
+   @logged
+   def method(self, value):
+      return value
+
+
+def test_01_logged_skips_disabled_levels():
+   handler = RecordingHandler()
+   Logging._logger.addHandler(handler)
+   try:
+      assert Logging().method(1) == 1
+      Logging().touched()
+      assert handler.records == []
+      # while disabled, the decorated method is the bare one
+      assert Logging().method.__func__ is Logging.__dict__["method"].method
+      Logging._logger.setLevel(logging.DEBUG)
+      assert Logging().method(2) == 2
+      Logging().touched()
+      assert handler.records == ["method called", "touched called"]
+      assert Logging.method(Logging(), 3) == 3
+   finally:
+      Logging._logger.setLevel(logging.INFO)
+      Logging._logger.removeHandler(handler)
+
+
+def test_02_queued_logging_uses_listener_thread():
+   logger = logging.getLogger("test_queued")
+   logger.propagate = False
+   handler = RecordingHandler()
+   logger.addHandler(handler)
+   listener = queued_logging(logger)
+   logger.warning("queued %s", "record")
+   listener.stop()
+   assert handler.records == ["queued record"]
+   assert threading.get_ident() not in handler.threads
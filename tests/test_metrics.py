@@ -0,0 +1,36 @@
+from pytest import raises
+
+from asynciohelpers.metrics import Registry
+
+
+def test_01_counter_and_gauge():
+   registry = Registry()
+   counter = registry.counter("test_events_total", "Events seen.", ("service",))
+   assert registry.counter("test_events_total", "Events seen.", ("service",)) is counter
+   counter.labels("a").inc()
+   counter.labels("a").inc(2)
+   counter.labels('say "hi"').inc()
+   gauge = registry.gauge("test_depth", "Queue depth.")
+   gauge.labels().set(1.5)
+
+   text = registry.render()
+   assert "# TYPE test_events_total counter" in text
+   assert 'test_events_total{service="a"} 3' in text
+   assert 'test_events_total{service="say \\"hi\\""} 1' in text
+   assert "test_depth 1.5" in text
+   with raises(ValueError):
+      registry.gauge("test_events_total", "Not a gauge.")
+
+
+def test_02_histogram():
+   registry = Registry()
+   histogram = registry.histogram("test_seconds", "Durations.", buckets=(0.1, 1))
+   for value in (0.05, 0.1, 0.5, 5):
+      histogram.labels().observe(value)
+
+   lines = registry.render().splitlines()
+   assert 'test_seconds_bucket{le="0.1"} 2' in lines
+   assert 'test_seconds_bucket{le="1"} 3' in lines
+   assert 'test_seconds_bucket{le="+Inf"} 4' in lines
+   assert "test_seconds_count 4" in lines
+   assert "test_seconds_sum 5.65" in lines
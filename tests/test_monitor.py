@@ -0,0 +1,24 @@
+import time, asyncio
+from pytest import mark
+
+from asynciohelpers.monitor import LagMonitor
+
+
+def block_the_loop():
+   time.sleep(0.5)
+
+
+@mark.asyncio
+async def test_01_blocking_call_is_caught(event_loop):
+
+   monitor = LagMonitor(event_loop, "test", interval=0.05, threshold=0.2)
+   monitor.start()
+   await asyncio.sleep(0.1, loop=event_loop)
+   block_the_loop()
+   await asyncio.sleep(0.1, loop=event_loop)
+   monitor.stop()
+
+   assert len(monitor.stalls) == 1
+   (stalled, task, stack) = monitor.stalls[0]
+   assert stalled >= 0.2
+   assert "block_the_loop" in stack
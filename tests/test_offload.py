@@ -0,0 +1,47 @@
+import time, asyncio, threading
+from pytest import mark
+
+from asynciohelpers.service import AsyncioRunning
+from asynciohelpers.util import loggerprovider
+from asynciohelpers.testing import LoggingServiceImpl
+
+
+def blocking(seconds):
+   time.sleep(seconds)
+   return threading.current_thread().name
+
+
+def square(value):
+   return value * value
+
+
+@loggerprovider
+class OffloadingService(AsyncioRunning, LoggingServiceImpl):
+
+   THREAD_WORKERS = 4
+   OFFLOAD_LIMIT = 2
+   PROCESS_WORKERS = 2
+
+   async def _wait(self):
+      await asyncio.sleep(60, loop=self._loop)
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_01_offload_is_limited_and_shut_down(event_loop):
+
+   service = OffloadingService()
+   service.set_loop(event_loop)
+   await service.start()
+
+   started = time.monotonic()
+   names = await asyncio.gather(*[service.offload(blocking, 0.1) for _ in range(4)],
+                                loop=event_loop)
+   assert time.monotonic() - started >= 0.2 # two at a time
+   assert all(name.startswith("OffloadingService") for name in names)
+   assert await service.offload_process(square, 7) == 49
+
+   (executor, limit) = service._get_executor("thread")
+   await service.stop()
+   assert service._executors is None
+   assert executor._shutdown
+   assert "executors" in service._shutdown_timings
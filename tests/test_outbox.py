@@ -0,0 +1,39 @@
+from pytest import raises
+
+from asynciohelpers.outbox import SpillRing, Outbox
+
+
+def test_01_ring_wraps_around():
+   ring = SpillRing(64)
+   try:
+      for i in range(20):
+         assert ring.append(b"message %02i" % i)
+         assert ring.append(b"x" * 30)
+         assert ring.popleft() == b"message %02i" % i
+         assert ring.popleft() == b"x" * 30
+      assert not ring.append(b"y" * 61)
+      with raises(IndexError):
+         ring.popleft()
+   finally:
+      ring.close()
+
+
+def test_02_outbox_spills_in_order():
+   outbox = Outbox(memory_limit=10, spill_size=1024)
+   try:
+      for i in range(10):
+         assert outbox.append(b"%03i" % i)
+      assert outbox.stats["spilled"] == 7
+      assert outbox.popleft() == b"000"
+      outbox.append(b"010")
+      assert [outbox.popleft() for i in range(len(outbox))] == [b"%03i" % i for i in range(1, 11)]
+   finally:
+      outbox.close()
+
+
+def test_03_outbox_is_bounded():
+   outbox = Outbox(memory_limit=10)
+   assert outbox.append(b"0123456789")
+   assert not outbox.append(b"x")
+   assert outbox.stats["dropped"] == 1
+   assert outbox.batch(100) == [b"0123456789"]
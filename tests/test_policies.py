@@ -0,0 +1,62 @@
+from pytest import raises
+
+from asynciohelpers.policies import ReconnectPolicy, FixedDelay, ExponentialBackoff, CircuitBreaker
+
+
+def test_01_first_attempt_is_immediate():
+   for policy in (FixedDelay(5), ExponentialBackoff(), CircuitBreaker(FixedDelay(5))):
+      assert policy.next_delay() == 0
+
+
+def test_02_fixed_delay():
+   policy = FixedDelay(5)
+   policy.next_delay()
+   policy.failed()
+   assert policy.next_delay() == 5
+   assert policy.stats["attempts"] == 2
+   assert policy.stats["failures"] == 1
+
+
+def test_03_exponential_backoff_is_capped():
+   policy = ExponentialBackoff(base=1, cap=10, jitter=None)
+   policy.next_delay()
+   delays = []
+   for i in range(6):
+      policy.failed()
+      delays.append(policy.next_delay())
+   assert delays == [1, 2, 4, 8, 10, 10]
+   policy.succeeded()
+   assert policy.next_delay() == 1
+
+
+def test_04_jitter_stays_within_bounds():
+   for jitter in ("full", "decorrelated"):
+      policy = ExponentialBackoff(base=1, cap=10, jitter=jitter)
+      policy.next_delay()
+      for i in range(50):
+         policy.failed()
+         assert 0 <= policy.next_delay() <= 10
+   with raises(ValueError):
+      ExponentialBackoff(jitter="bogus")
+
+
+def test_05_circuit_breaker_opens_and_recovers():
+   policy = CircuitBreaker(FixedDelay(1), threshold=3, reset_timeout=30)
+   for i in range(3):
+      assert policy.state == policy.CLOSED
+      policy.next_delay()
+      policy.failed()
+   assert policy.state == policy.OPEN
+   assert policy.next_delay() == 30
+   assert policy.state == policy.HALF_OPEN
+   policy.failed()
+   assert policy.state == policy.OPEN
+   assert policy.stats["opened"] == 2
+   policy.next_delay()
+   policy.succeeded()
+   assert policy.state == policy.CLOSED
+
+
+def test_06_policies_must_define_delays():
+   with raises(TypeError):
+      ReconnectPolicy()
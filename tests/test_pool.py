@@ -0,0 +1,98 @@
+import asyncio
+from pytest import mark
+
+from asynciohelpers.service import RECONNECTS, BYTES_SENT
+from asynciohelpers.testing import get_socket_server
+
+from .servers import PooledAsyncioServer
+from .config import TEST_HOST, TEST_PORT
+
+
+class LingeringPool(PooledAsyncioServer):
+
+   RECONNECT_DELAY = 0.05
+
+   async def _wait(self):
+      await asyncio.sleep(60, loop=self._loop)
+
+
+async def started_pool(loop, **settings):
+   server = type("Pool", (LingeringPool,), settings)()
+   server.set_loop(loop)
+   await server.start()
+   for _ in range(50):
+      if len(server._pool) == server.POOL_SIZE:
+         break
+      await asyncio.sleep(0.02, loop=loop)
+   assert len(server._pool) == server.POOL_SIZE
+   return server
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_01_least_buffered_dispatch(event_loop):
+
+   mock = await get_socket_server(event_loop, TEST_HOST, TEST_PORT)
+   server = await started_pool(event_loop, POOL_DISPATCH="leastbuffered")
+
+   buffered = {id(transport): size
+               for ((transport, protocol), size) in zip(server._pool, (300, 100, 200))}
+   for (transport, protocol) in server._pool:
+      transport.get_write_buffer_size = lambda transport=transport: buffered[id(transport)]
+   (transport, protocol) = server._writer()
+   assert buffered[id(transport)] == 100
+   buffered[id(transport)] = 400
+   assert buffered[id(server._writer()[0])] == 200
+
+   await server.stop()
+   mock.close()
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_02_lost_member_is_replaced(event_loop):
+
+   mock = await get_socket_server(event_loop, TEST_HOST, TEST_PORT)
+   server = await started_pool(event_loop)
+   reconnects = RECONNECTS.labels(server.__class__.__name__)
+   before = reconnects.value
+
+   (transport, protocol) = server._pool[0]
+   transport.close()
+   await asyncio.sleep(0.3, loop=event_loop)
+
+   assert len(server._pool) == server.POOL_SIZE
+   assert (transport, protocol) not in server._pool
+   assert sorted(member[1].pool_slot for member in server._pool) == list(range(server.POOL_SIZE))
+   assert reconnects.value == before + 1
+
+   # cancelling a member leaves the future of its protocol alone
+   (transport, protocol) = server._pool[0]
+   server._pool_tasks[protocol.pool_slot].cancel()
+   await asyncio.sleep(0.05, loop=event_loop)
+   assert not protocol.is_closed.cancelled()
+
+   await server.stop()
+   assert protocol.is_closed.done()
+   mock.close()
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_03_teardown_without_connecting(event_loop):
+   server = LingeringPool()
+   server.set_loop(event_loop)
+   await server._teardown()
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_04_unthrottled_writes_are_counted(event_loop):
+
+   mock = await get_socket_server(event_loop, TEST_HOST, TEST_PORT)
+   server = await started_pool(event_loop)
+   sent = BYTES_SENT.labels(server.__class__.__name__)
+   before = sent.value
+   server.write(b"x" * 10)
+   await server.send(b"y" * 5)
+   await server._outbound.join()
+   assert sent.value == before + 15
+
+   await server.stop()
+   mock.close()
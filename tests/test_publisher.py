@@ -0,0 +1,107 @@
+import asyncio, logging
+from pytest import mark
+
+from asynciohelpers.protocols import FlowControlProtocol
+from asynciohelpers.wamp import CoalescingPublisher
+
+
+class RecordingSession:
+
+   def __init__(self):
+      self.published = []
+
+   def publish(self, topic, *args):
+      self.published.append((topic,) + args)
+
+
+class FakeService:
+   "just what the publisher uses of a WAMP service"
+
+   def __init__(self, loop):
+      self._loop = loop
+      self._logger = logging.getLogger("test")
+      self._protocol = FlowControlProtocol()
+      self._protocol._session = RecordingSession()
+
+   def _spawn(self, coro, daemon=False):
+      return self._loop.create_task(coro)
+
+   def _writer(self, key=None):
+      return (None, self._protocol)
+
+
+class DisconnectedService(FakeService):
+
+   def _writer(self, key=None):
+      raise ConnectionError("no session")
+
+
+@mark.asyncio
+async def test_01_batch_per_tick(event_loop):
+
+   service = FakeService(event_loop)
+   publisher = CoalescingPublisher(service, batch=True)
+   for value in range(100):
+      await publisher.publish("com.example.%s" % (value % 2), value)
+   await publisher.flush()
+
+   published = service._protocol._session.published
+   assert published == [("com.example.0", list(range(0, 100, 2))),
+                        ("com.example.1", list(range(1, 100, 2)))]
+   assert publisher.saved == 98
+
+
+@mark.asyncio
+async def test_02_merge_with_backpressure(event_loop):
+
+   service = FakeService(event_loop)
+   publisher = CoalescingPublisher(service, window=0.05, merge=True, max_pending=2)
+   service._protocol.pause_writing()
+   for value in range(10):
+      await publisher.publish("com.example.a", value)
+   await publisher.publish("com.example.b", 0)
+   await asyncio.sleep(0.1, loop=event_loop)
+   assert service._protocol._session.published == []
+
+   # the next two topics are queued, a third does not fit while paused
+   await publisher.publish("com.example.c", 0)
+   await publisher.publish("com.example.a", 10)
+   blocked = event_loop.create_task(publisher.publish("com.example.d", 0))
+   await asyncio.sleep(0.1, loop=event_loop)
+   assert not blocked.done()
+
+   service._protocol.resume_writing()
+   await blocked
+   await publisher.flush()
+   assert service._protocol._session.published == [
+      ("com.example.a", 9), ("com.example.b", 0), ("com.example.c", 0),
+      ("com.example.a", 10), ("com.example.d", 0)]
+   assert publisher.saved == 9 # the first ten events to com.example.a went as one
+
+
+@mark.asyncio
+async def test_03_events_are_published_as_they_are(event_loop):
+
+   service = FakeService(event_loop)
+   publisher = CoalescingPublisher(service)
+   await publisher.publish("com.example.a", {"value": 1})
+   await publisher.publish("com.example.b", 2)
+   await publisher.publish("com.example.a", {"value": 3})
+   await publisher.flush()
+
+   assert service._protocol._session.published == [
+      ("com.example.a", {"value": 1}), ("com.example.a", {"value": 3}), ("com.example.b", 2)]
+   assert publisher.stats == {"events": 3, "frames": 3, "dropped": 0}
+   assert publisher.saved == 0 # only delayed
+
+
+@mark.asyncio
+async def test_04_events_not_sent_are_not_saved(event_loop):
+
+   service = DisconnectedService(event_loop)
+   publisher = CoalescingPublisher(service, merge=True)
+   for value in range(5):
+      await publisher.publish("com.example.a", value)
+   await publisher.flush()
+   assert publisher.stats == {"events": 5, "frames": 0, "dropped": 5}
+   assert publisher.saved == 0
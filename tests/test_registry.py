@@ -0,0 +1,168 @@
+import socket
+import asyncio
+from pytest import mark, raises
+
+from .servers import PooledWAMPService
+
+
+class RecordingSession:
+
+   def __init__(self, loop):
+      self.loop = loop
+      self.applied = []
+
+   async def subscribe(self, handler, topic, options=None):
+      await asyncio.sleep(0.05, loop=self.loop)
+      self.applied.append(("subscribe", topic))
+
+   async def register(self, endpoint, procedure, options=None):
+      await asyncio.sleep(0.05, loop=self.loop)
+      if procedure == "com.example.taken":
+         raise Exception("procedure already exists")
+      self.applied.append(("register", procedure))
+
+
+class FakeProtocol:
+
+   def __init__(self, loop, slot):
+      self._session = RecordingSession(loop)
+      self.pool_slot = slot
+      self.restored = False
+
+
+class Handle:
+
+   def __init__(self, router, applied):
+      self.router = router
+      self.applied = applied
+
+   async def unsubscribe(self):
+      self.router.remove(self.applied)
+
+   unregister = unsubscribe
+
+
+class RouterSession:
+   "a session on a router that, like a real one, registers each procedure only once"
+
+   def __init__(self, router, name):
+      self.router = router
+      self.name = name
+
+   async def subscribe(self, handler, topic, options=None):
+      self.router.append((self.name, "subscribe", topic))
+      return Handle(self.router, self.router[-1])
+
+   async def register(self, endpoint, procedure, options=None):
+      if any(applied[1:] == ("register", procedure) for applied in self.router):
+         raise Exception("procedure already exists")
+      self.router.append((self.name, "register", procedure))
+      return Handle(self.router, self.router[-1])
+
+
+class RouterProtocol(FakeProtocol):
+
+   def __init__(self, loop, slot, router):
+      super().__init__(loop, slot)
+      self._session = RouterSession(router, slot)
+      self.is_closed = asyncio.Future(loop=loop)
+
+
+def closed_port():
+   with socket.socket() as sock:
+      sock.bind(("127.0.0.1", 0))
+      return sock.getsockname()[1]
+
+
+class RegistryService(PooledWAMPService):
+
+   SUBSCRIPTIONS = {"com.example.%i" % topic: "on_event" for topic in range(20)}
+   REGISTRATIONS = {"com.example.add": "add"}
+   CALL_CACHE_INVALIDATE = "com.example.changed"
+
+   def on_event(self, event):
+      pass
+
+   def add(self, a, b):
+      return a + b
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_01_restore_concurrently_once_per_pool(event_loop):
+
+   service = RegistryService()
+   service.set_loop(event_loop)
+   await service.register_limited(lambda: None, "com.example.slow", concurrency=1)
+   assert await service.subscribe(service.on_event, "com.example.late") is None
+
+   protocols = [FakeProtocol(event_loop, slot) for slot in range(service.POOL_SIZE)]
+   started = event_loop.time()
+   restored = await asyncio.gather(*[service._restore(protocol) for protocol in protocols],
+                                   loop=event_loop)
+   assert event_loop.time() - started < 0.2 # not one after the other
+   assert all(restored) and all(protocol.restored for protocol in protocols)
+
+   applied = [entry for protocol in protocols for entry in protocol._session.applied]
+   assert len(applied) == len(set(applied)) == 24
+   for protocol in protocols:
+      for (kind, uri) in protocol._session.applied:
+         assert service._key_slot(uri) == protocol.pool_slot
+   assert service._limiters["com.example.slow"] in [entry[2] for entry in service._registry.values()]
+
+   # without a pool, everything is restored on the one session; failures are reported
+   await service.register(service.add, "com.example.taken")
+   protocol = FakeProtocol(event_loop, None)
+   assert not await service._restore(protocol)
+   assert len(protocol._session.applied) == 24
+
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_02_fall_back_while_home_slot_down(event_loop):
+
+   class DownService(RegistryService):
+      _endpoints = [("127.0.0.1", closed_port())]
+
+   service = DownService()
+   service.set_loop(event_loop)
+   service._pool = []
+   router = []
+   down = service._key_slot("com.example.add")
+   uris = [entry[1] for entry in service._get_registry().values()]
+   homeless = [uri for uri in uris if service._key_slot(uri) == down]
+
+   async def join(slot):
+      protocol = RouterProtocol(event_loop, slot, router)
+      assert await service._restore(protocol)
+      service._pool.append((None, protocol))
+      return protocol
+
+   def placed():
+      slots = {uri: slot for (slot, kind, uri) in router}
+      assert len(slots) == len(router) # each applied once
+      return slots
+
+   for slot in range(service.POOL_SIZE):
+      if slot != down:
+         await join(slot)
+   assert sorted(placed()) == sorted(set(uris) - set(homeless))
+
+   # the home slot cannot connect: its entries go on the other members meanwhile
+   with raises(OSError):
+      await service._open_connection(down)
+   await asyncio.sleep(0.05, loop=event_loop)
+   assert sorted(placed()) == sorted(uris)
+   assert down not in placed().values()
+
+   # once it is back, they move home, the registration too
+   home = await join(down)
+   assert sorted(placed()) == sorted(uris)
+   assert all(slot == service._key_slot(uri) for (uri, slot) in placed().items())
+
+   # and when it is lost again, they fall back again
+   home.is_closed.set_result(True)
+   service._pool.remove((None, home))
+   router[:] = [applied for applied in router if applied[0] != down]
+   await asyncio.sleep(0.05, loop=event_loop)
+   assert sorted(placed()) == sorted(uris)
+   assert down not in placed().values()
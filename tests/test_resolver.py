@@ -0,0 +1,76 @@
+import socket, asyncio
+from pytest import mark, raises
+
+from asynciohelpers.resolver import CachingResolver
+
+
+ADDRESS = (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", 80))
+
+
+class FakeDNS:
+   "stands in for loop.getaddrinfo, counting lookups"
+
+   def __init__(self, loop):
+      self.loop = loop
+      self.lookups = 0
+      self.failing = False
+
+   async def getaddrinfo(self, host, port, **kwargs):
+      self.lookups += 1
+      await asyncio.sleep(0.01, loop=self.loop)
+      if self.failing or host == "nxdomain.invalid":
+         raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+      return [ADDRESS]
+
+
+@mark.asyncio
+async def test_01_cache_prefetch_stale_and_negative(event_loop):
+
+   dns = FakeDNS(event_loop)
+   event_loop.getaddrinfo = dns.getaddrinfo
+   resolver = CachingResolver(event_loop, ttl=0.2, negative_ttl=0.2, prefetch=0.5, stale=1)
+
+   # concurrent misses share one lookup
+   answers = await asyncio.gather(*[resolver.getaddrinfo("example.com", 80) for _ in range(5)],
+                                  loop=event_loop)
+   assert answers == [[ADDRESS]] * 5 and dns.lookups == 1
+
+   await asyncio.sleep(0.15, loop=event_loop)
+   assert await resolver.getaddrinfo("example.com", 80) == [ADDRESS]
+   await asyncio.sleep(0.05, loop=event_loop)
+   assert dns.lookups == 2 and resolver.stats["prefetches"] == 1
+
+   # past the ttl, a failing refresh keeps the stale answer in use
+   dns.failing = True
+   await asyncio.sleep(0.3, loop=event_loop)
+   assert await resolver.getaddrinfo("example.com", 80) == [ADDRESS]
+   await asyncio.sleep(0.05, loop=event_loop)
+   assert await resolver.getaddrinfo("example.com", 80) == [ADDRESS]
+   assert resolver.stats["stale"] == 2
+
+   for _ in range(2):
+      with raises(socket.gaierror):
+         await resolver.getaddrinfo("nxdomain.invalid", 80)
+   assert resolver.stats["negative"] == 1
+
+
+@mark.asyncio
+async def test_02_cancelled_lookup_is_forgotten(event_loop):
+
+   dns = FakeDNS(event_loop)
+   event_loop.getaddrinfo = dns.getaddrinfo
+   spawned = []
+
+   def spawn(coro):
+      "cancel the first lookup before it gets to run, as stopping a service may"
+      task = event_loop.create_task(coro)
+      if not spawned:
+         task.cancel()
+      spawned.append(task)
+      return task
+
+   resolver = CachingResolver(event_loop, spawn=spawn)
+   with raises(asyncio.CancelledError):
+      await resolver.getaddrinfo("example.com", 80)
+   assert await resolver.getaddrinfo("example.com", 80) == [ADDRESS]
+   assert len(spawned) == 2 and not resolver._lookups
@@ -0,0 +1,81 @@
+import asyncio
+from pytest import mark, fixture
+
+from asynciohelpers.service import AsyncioRunning
+from asynciohelpers.policies import FixedDelay
+from asynciohelpers.util import loggerprovider
+from asynciohelpers.testing import LoggingServiceImpl
+
+
+@loggerprovider
+class FlakyService(AsyncioRunning, LoggingServiceImpl):
+   "one steady runner next to one that keeps failing"
+
+   RUNNERS = ("_steady", "_flaky")
+   RESTART_DELAY = 0.05
+   MAX_RESTARTS = 3
+
+   async def _setup(self):
+      self.starts = {"_steady": 0, "_flaky": 0}
+
+   async def _wait(self):
+      await asyncio.sleep(60, loop=self._loop)
+
+   async def _steady(self):
+      self.starts["_steady"] += 1
+      await asyncio.sleep(60, loop=self._loop)
+
+   async def _flaky(self):
+      self.starts["_flaky"] += 1
+      await asyncio.sleep(0.01, loop=self._loop)
+      raise RuntimeError("flaky runner failed")
+
+
+@mark.parametrize("strategy,steady_starts", [("one_for_one", 1), ("one_for_all", 4)])
+@mark.asyncio(forbid_global_loop=True)
+async def test_01_restart_strategy_and_crash_loop(event_loop, strategy, steady_starts):
+
+   service = FlakyService()
+   service.RESTART_STRATEGY = strategy
+   service.set_loop(event_loop)
+   await service.start()
+   await asyncio.sleep(1, loop=event_loop)
+
+   # three restarts are allowed, the fourth failure stops the service
+   assert service.starts == {"_steady": steady_starts, "_flaky": 4}
+   assert service._teardown_task.done()
+
+
+def test_02_internal_loop_supervises_alike():
+
+   asyncio.set_event_loop(asyncio.new_event_loop())
+   service = FlakyService()
+   service.start()
+   assert service.starts == {"_steady": 1, "_flaky": 4}
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_03_runner_that_cannot_start_stops_the_service(event_loop):
+
+   class MisnamedService(FlakyService):
+      RUNNERS = ("_steady", "_members")
+      _members = [] # not a runner at all
+
+   service = MisnamedService()
+   service.set_loop(event_loop)
+   await service.start()
+   await asyncio.sleep(0.1, loop=event_loop)
+   assert service._teardown_task is not None and service._teardown_task.done()
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_04_restart_policy_may_be_a_function(event_loop):
+
+   class QuickService(FlakyService):
+      RESTART_POLICY = lambda: FixedDelay(0.01)
+
+   service = QuickService()
+   service.set_loop(event_loop)
+   await service.start()
+   await asyncio.sleep(0.5, loop=event_loop)
+   assert service.starts == {"_steady": 1, "_flaky": 4}
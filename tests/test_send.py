@@ -0,0 +1,94 @@
+import asyncio
+from pytest import mark
+
+from asynciohelpers.metrics import REGISTRY
+from asynciohelpers.protocols import FlowControlProtocol
+
+from .servers import ConnectingAsyncioServer
+
+
+class RecordingTransport:
+
+   def __init__(self):
+      self.written = []
+
+   def write(self, data):
+      self.written.append(data)
+
+   def is_closing(self):
+      return False
+
+
+class SendingServer(ConnectingAsyncioServer):
+
+   SEND_QUEUE_SIZE = 2
+
+
+class ExportingServer(SendingServer):
+   "a class of its own, so its metrics start from zero"
+
+
+def connected(loop, factory=SendingServer):
+   server = factory()
+   server.set_loop(loop)
+   server._transport = RecordingTransport()
+   server._protocol = FlowControlProtocol()
+   return server
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_01_paused_writer_blocks_send(event_loop):
+
+   server = connected(event_loop)
+   server._protocol.pause_writing()
+
+   await server.send(b"1") # taken by the sender, which waits for the transport
+   await asyncio.sleep(0.01, loop=event_loop)
+   await server.send(b"2")
+   await server.send(b"3")
+   blocked = event_loop.create_task(server.send(b"4"))
+   await asyncio.sleep(0.05, loop=event_loop)
+
+   assert not blocked.done()
+   assert server._transport.written == []
+   assert server._outbound.qsize() == SendingServer.SEND_QUEUE_SIZE
+
+   server._protocol.resume_writing()
+   await asyncio.wait_for(blocked, 1, loop=event_loop)
+   await server._outbound.join()
+   assert server._transport.written == [b"1", b"2", b"3", b"4"]
+   assert server._send_stats["pauses"] == 1
+   assert server._send_stats["queue_blocked"] > 0
+   assert server._send_stats["drain_blocked"] >= 0.05
+   server._sender_task.cancel()
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_02_pauses_are_exported(event_loop):
+
+   server = connected(event_loop, ExportingServer)
+   for _ in range(2):
+      server._protocol.pause_writing()
+      await server.send(b"x")
+      await asyncio.sleep(0.01, loop=event_loop)
+      server._protocol.resume_writing()
+      await server._outbound.join()
+
+   text = REGISTRY.render()
+   assert 'asynciohelpers_write_pauses_total{service="ExportingServer"} 2' in text
+   assert 'asynciohelpers_write_paused_seconds_total{service="ExportingServer"}' in text
+   assert 'asynciohelpers_sent_bytes_total{service="ExportingServer"} 2' in text
+   server._sender_task.cancel()
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_03_lost_connection_fails_the_waiting_write(event_loop):
+
+   server = connected(event_loop)
+   server._protocol.pause_writing()
+   await server.send(b"1")
+   await asyncio.sleep(0.01, loop=event_loop)
+   server._protocol.connection_lost(None)
+   await asyncio.wait_for(server._outbound.join(), 1, loop=event_loop)
+   assert server._transport.written == []
+   server._sender_task.cancel()
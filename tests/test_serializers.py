@@ -0,0 +1,20 @@
+import txaio
+from pytest import raises
+
+from asynciohelpers.wamp import get_serializers
+
+from .servers import ConnectingWAMPService
+
+
+def test_01_preference_and_validation():
+
+   txaio.use_asyncio()
+   ids = [serializer.SERIALIZER_ID for serializer in ConnectingWAMPService()._serializers()]
+   assert ids[-1] == "json"
+   assert ids == sorted(ids, key=["msgpack", "cbor", "ubjson", "json"].index)
+
+   assert [s.SERIALIZER_ID for s in get_serializers(["json"])] == ["json"]
+   with raises(ValueError):
+      get_serializers(["json", "xml"])
+   with raises(ValueError):
+      get_serializers(["xml"], strict=False)
@@ -0,0 +1,83 @@
+import time, asyncio
+from pytest import mark
+
+from asynciohelpers.testing import get_socket_server
+
+from .servers import ConnectingAsyncioServer, PooledAsyncioServer
+from .config import TEST_HOST, TEST_PORT
+
+
+class StuckServer(ConnectingAsyncioServer):
+   "a service whose spawned work outlives the shutdown deadline"
+
+   SHUTDOWN_TIMEOUT = 0.5
+
+   async def _run(self):
+      self._finished = self._spawn(asyncio.sleep(0.1, loop=self._loop))
+      self._stuck = self._spawn(asyncio.sleep(60, loop=self._loop))
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_01_shutdown_is_scoped_and_bounded(event_loop):
+
+   mock = await get_socket_server(event_loop, TEST_HOST, TEST_PORT)
+   bystander = event_loop.create_task(asyncio.sleep(60, loop=event_loop))
+
+   server = StuckServer()
+   server.set_loop(event_loop)
+   await server.start()
+   await asyncio.sleep(0.05, loop=event_loop)
+
+   started = time.monotonic()
+   await server.stop()
+   assert time.monotonic() - started < 2
+   assert server._finished.done() and not server._finished.cancelled()
+   assert server._stuck.cancelled()
+   assert not bystander.done()
+   assert set(server._shutdown_timings) == {"teardown", "drain", "cancel"}
+
+   bystander.cancel()
+   mock.close()
+
+
+class NonReadingProtocol(asyncio.Protocol):
+   "a peer that accepts the connection but never reads from it"
+
+   def connection_made(self, transport):
+      transport.pause_reading()
+
+
+@mark.parametrize("factory", (ConnectingAsyncioServer, PooledAsyncioServer))
+@mark.asyncio(forbid_global_loop=True)
+async def test_02_stuck_peer_does_not_keep_transports_open(factory, event_loop):
+
+   peer = await event_loop.create_server(NonReadingProtocol, TEST_HOST, TEST_PORT)
+
+   class Sender(factory):
+      SHUTDOWN_TIMEOUT = 1
+      WRITE_HIGH_WATER = 64 * 1024
+      WRITE_LOW_WATER = 16 * 1024
+
+      async def _wait(self):
+         await asyncio.sleep(60, loop=self._loop)
+
+   server = Sender()
+   server.set_loop(event_loop)
+   await server.start()
+   for _ in range(100): # more than the socket buffers hold
+      await server.send(bytes(1024 * 1024))
+   await asyncio.sleep(0.2, loop=event_loop)
+
+   started = time.monotonic()
+   await server.stop()
+   assert time.monotonic() - started < 1.5
+   if factory is PooledAsyncioServer:
+      members = server._pool
+      assert len(members) == factory.POOL_SIZE
+   else:
+      members = [(server._transport, server._protocol)]
+   assert server._send_stats["pauses"]
+   for (transport, protocol) in members:
+      assert transport.is_closing() and protocol.is_closed.done()
+
+   peer.close()
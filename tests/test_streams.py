@@ -0,0 +1,67 @@
+import asyncio
+from pytest import mark, raises
+
+from asynciohelpers.streams import MessageQueue
+from asynciohelpers.protocols import MessageProtocol
+from .servers import ConnectingAsyncioServer
+
+
+class MockTransport:
+
+   paused = False
+
+   def pause_reading(self):
+      self.paused = True
+
+   def resume_reading(self):
+      self.paused = False
+
+
+@mark.asyncio
+async def test_01_reading_is_paused_and_resumed(event_loop):
+
+   transport = MockTransport()
+   queue = MessageQueue(event_loop, high=4, low=1)
+   for i in range(4):
+      queue.put(i, transport)
+   assert transport.paused
+
+   assert await queue.get() == 0
+   assert await queue.get() == 1
+   assert transport.paused
+   assert await queue.get() == 2
+   assert not transport.paused
+   assert queue.stats["pauses"] == 1
+
+
+@mark.asyncio
+async def test_02_iteration_ends_when_closed(event_loop):
+
+   queue = MessageQueue(event_loop)
+
+   async def consume():
+      return [message async for message in queue]
+
+   consumer = event_loop.create_task(consume())
+   for i in range(3):
+      queue.put(i)
+      await asyncio.sleep(0, loop=event_loop)
+   queue.close()
+   assert await consumer == [0, 1, 2]
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_03_messages_need_a_message_protocol(event_loop):
+
+   class Receiving(ConnectingAsyncioServer):
+      _transport_factory = MessageProtocol
+
+   service = Receiving()
+   service.set_loop(event_loop)
+   assert service._new_protocol().inbound is service.messages()
+
+   service = ConnectingAsyncioServer()
+   service.set_loop(event_loop)
+   with raises(TypeError):
+      service.messages()
+   assert not hasattr(service._new_protocol(), "inbound")
@@ -0,0 +1,48 @@
+import time, signal, multiprocessing
+from pytest import fixture
+
+from asynciohelpers.policies import ExponentialBackoff
+from asynciohelpers.supervisor import ProcessSupervisor, SETUP_FAILED
+
+from .fixtures import with_mock_server
+from .servers import ConnectingAsyncioServer
+
+
+def supervise(factory, workers, status):
+   supervisor = ProcessSupervisor(factory, workers=workers)
+   supervisor.RESTART_POLICY = lambda: ExponentialBackoff(base=0.1, cap=0.5)
+   status.value = supervisor.run()
+
+
+def test_01_workers_drain_on_sigterm(with_mock_server):
+
+   status = multiprocessing.Value("i", -1)
+   sp = multiprocessing.Process(target=supervise, args=(ConnectingAsyncioServer, 2, status))
+   time.sleep(1)
+   sp.start()
+   time.sleep(2)
+   sp.terminate()
+   sp.join()
+   assert status.value == 0
+
+
+def test_02_crashing_workers_are_reported():
+
+   status = multiprocessing.Value("i", -1)
+   sp = multiprocessing.Process(target=supervise, args=(ConnectingAsyncioServer, 2, status))
+   sp.start()
+   time.sleep(2)
+   sp.terminate()
+   sp.join()
+   assert status.value != 0
+
+
+def test_03_workers_failing_setup_are_given_up():
+
+   class QuickSupervisor(ProcessSupervisor):
+      RESTART_POLICY = lambda: ExponentialBackoff(base=0.1, cap=0.5)
+      MAX_SETUP_FAILURES = 2
+
+   supervisor = QuickSupervisor(ConnectingAsyncioServer, workers=2)
+   assert supervisor.run() == SETUP_FAILED
+   assert supervisor.exitcodes == {0: SETUP_FAILED, 1: SETUP_FAILED}
@@ -0,0 +1,78 @@
+import os, ssl, asyncio
+from pytest import mark
+
+from asynciohelpers.tls import ResumingContext, ssl_enabled
+
+from .servers import ConnectingAsyncioServer, ReConnectingAsyncioServer
+from .config import TEST_HOST
+
+
+HERE = os.path.dirname(__file__)
+CERTFILE = os.path.join(HERE, "tls_cert.pem") # self-signed, for localhost
+KEYFILE = os.path.join(HERE, "tls_key.pem")
+
+
+class SecureServer(ConnectingAsyncioServer):
+   _ssl = "True"
+   SSL_CIPHERS = "ECDHE+AESGCM"
+
+
+def test_01_ssl_settings():
+   assert ssl_enabled("yes") and ssl_enabled(True)
+   assert not ssl_enabled("false") and not ssl_enabled("0") and not ssl_enabled(None)
+
+
+def test_02_one_context_per_service():
+
+   server = SecureServer()
+   context = server._get_ssl_context()
+   assert isinstance(context, ResumingContext)
+   assert context is server._get_ssl_context()
+   assert context.verify_mode == ssl.CERT_REQUIRED and context.check_hostname
+   assert all("GCM" in cipher["name"] for cipher in context.get_ciphers()
+              if cipher["protocol"] != "TLSv1.3")
+   assert ConnectingAsyncioServer()._get_ssl_context() is None
+
+
+class DroppingProtocol(asyncio.Protocol):
+   "closes each connection shortly after it is made, for the client to reconnect"
+
+   def connection_made(self, transport):
+      asyncio.get_event_loop().call_later(0.2, transport.close)
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_03_reconnect_resumes_session(event_loop):
+
+   context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+   context.load_cert_chain(CERTFILE, KEYFILE)
+   peer = await event_loop.create_server(DroppingProtocol, TEST_HOST, 0, ssl=context)
+
+   class Reconnecting(ReConnectingAsyncioServer):
+      _host = "localhost"
+      _port = peer.sockets[0].getsockname()[1]
+      _ssl = True
+      SSL_CAFILE = CERTFILE
+      RECONNECT_DELAY = 0.05
+
+      async def _run(self):
+         pass
+
+      async def _wait(self):
+         await asyncio.sleep(60, loop=self._loop)
+
+   server = Reconnecting()
+   server.set_loop(event_loop)
+   await server.start()
+   assert not server._transport.get_extra_info("ssl_object").session_reused
+
+   first = server._transport
+   for _ in range(50):
+      await asyncio.sleep(0.05, loop=event_loop)
+      if server._transport is not first and not server._transport.is_closing():
+         break
+   assert server._transport.get_extra_info("ssl_object").session_reused
+   assert server._tls_stats["resumed"] >= 1
+
+   await server.stop()
+   peer.close()
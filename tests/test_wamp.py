@@ -6,11 +6,11 @@ from pytest import raises, mark, fixture
 from asynciohelpers.testing import crossbar_router, CrossbarRouter
 
 from .fixtures import with_mock_server, crossbar_router_running
-from .servers import ConnectingWAMPService, ReConnectingWAMPService
-from .config import TEST_HOST, TEST_PORT, logger
+from .servers import ConnectingWAMPService, ReConnectingWAMPService, PooledWAMPService
+from .config import TEST_HOST, TEST_PORT, TEST_WAMP_HOST, TEST_WAMP_PORT, logger
 
 
-tested_services = (ConnectingWAMPService, ReConnectingWAMPService,)
+tested_services = (ConnectingWAMPService, ReConnectingWAMPService, PooledWAMPService,)
 
 
 @fixture(scope="module", params=tested_services)
@@ -139,3 +139,25 @@ async def test_04_rejoin_realm(servicefactory, event_loop):
       await server.stop()
 
    await asyncio.sleep(1, loop=event_loop)
+
+
+class SilentRouter(asyncio.Protocol):
+   "accepts connections but never answers, neither the WebSocket handshake nor HELLO"
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_05_join_times_out(servicefactory, event_loop):
+
+   import txaio
+   txaio.use_asyncio()
+   txaio.config.loop = event_loop
+
+   class Impatient(servicefactory):
+      JOIN_TIMEOUT = 0.2
+
+   router = await event_loop.create_server(SilentRouter, TEST_WAMP_HOST, TEST_WAMP_PORT)
+   server = Impatient()
+   server.set_loop(event_loop)
+   with raises(ConnectionError):
+      await asyncio.wait_for(server._open_connection(), 2, loop=event_loop)
+   router.close()
@@ -0,0 +1,109 @@
+import asyncio
+from pytest import mark, raises
+
+from asynciohelpers.workers import AsyncioWorkerPool
+from asynciohelpers.util import loggerprovider
+from asynciohelpers.testing import LoggingServiceImpl
+
+
+@loggerprovider
+class SquaringPool(AsyncioWorkerPool, LoggingServiceImpl):
+
+   WORKERS = 2
+   BATCH_SIZE = 10
+   BATCH_WAIT = 0.01
+   ITEM_TIMEOUT = 0.5
+
+   async def _wait(self):
+      await asyncio.sleep(60, loop=self._loop)
+
+   async def _setup(self):
+      self.results = []
+      self.concurrency = 0
+      self.max_concurrency = 0
+
+   async def _process(self, items):
+      self.concurrency += 1
+      self.max_concurrency = max(self.max_concurrency, self.concurrency)
+      try:
+         if -1 in items:
+            await asyncio.sleep(1, loop=self._loop)
+         await asyncio.sleep(0.01, loop=self._loop)
+         self.results.extend(item * item for item in items)
+      finally:
+         self.concurrency -= 1
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_01_batches_resize_and_timeouts(event_loop):
+
+   pool = SquaringPool()
+   pool.set_loop(event_loop)
+   await pool.start()
+   await asyncio.sleep(0.01, loop=event_loop)
+   assert len(pool._workers) == 2
+
+   pool.resize(4)
+   for item in range(100):
+      await pool.submit(item)
+   await pool._queue.join()
+   assert sorted(pool.results) == [item * item for item in range(100)]
+   assert pool.max_concurrency > 1
+   assert pool.stats["batches"] < 100
+
+   pool.resize(1)
+   assert len(pool._workers) == 1
+   await pool.submit(-1)
+   await pool._queue.join()
+   assert pool.stats["timeouts"] == 1
+   assert pool.stats["processed"] == 100
+
+   await pool.stop()
+
+
+@loggerprovider
+class StuckPool(SquaringPool):
+
+   WORKERS = 1
+   BATCH_SIZE = 1
+   ITEM_TIMEOUT = None
+   SHUTDOWN_TIMEOUT = 0.5
+
+   async def _process(self, item):
+      await asyncio.sleep(60, loop=self._loop)
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_02_shutdown_is_bounded_once(event_loop):
+
+   pool = StuckPool()
+   pool.set_loop(event_loop)
+   await pool.start()
+   for item in range(3):
+      await pool.submit(item)
+   await asyncio.sleep(0.05, loop=event_loop)
+
+   started = event_loop.time()
+   await pool.stop()
+   assert event_loop.time() - started < 0.9 # not one SHUTDOWN_TIMEOUT after another
+   assert not pool._workers
+   assert pool.stats["failed"] == 0 # a cancelled worker does not count its item as failed
+
+
+def test_03_process_is_required():
+   with raises(TypeError):
+      type("Incomplete", (AsyncioWorkerPool, LoggingServiceImpl), {})()
+
+
+@mark.asyncio(forbid_global_loop=True)
+async def test_04_workers_start_next_to_a_connection_pool(event_loop):
+
+   class PooledSquaringPool(SquaringPool):
+      _pool = () # as in AsyncioPooledConnecting
+
+   pool = PooledSquaringPool()
+   pool.set_loop(event_loop)
+   await pool.start()
+   await asyncio.sleep(0.01, loop=event_loop)
+   assert len(pool._workers) == 2
+   await pool.stop()